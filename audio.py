@@ -0,0 +1,182 @@
+import io
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, CancelledError
+import numpy as np
+import pygame
+
+ENVELOPE_WINDOW = 0.05  # seconds per lip-sync level sample
+
+class Clip:
+    """One queued sound plus its playback bookkeeping.
+
+    `source` is audio bytes or a Future that produces them (e.g. a sentence
+    still being synthesized); the driver thread waits for it when the clip's
+    turn comes, so clips always play in the order they were queued.
+    """
+
+    def __init__(self, source, on_start=None):
+        self.source = source
+        self.on_start = on_start
+        self.sound = None
+        self.envelope = []
+        self.started = None
+        self.cancelled = False
+        self.done = threading.Event()
+
+    def cancel(self):
+        self.cancelled = True
+        if isinstance(self.source, Future):
+            self.source.cancel()
+
+    def decode(self):
+        """Wait for the source and decode it; False if there is nothing to play."""
+        data = self.source
+        if isinstance(data, Future):
+            try:
+                data = data.result()
+            except CancelledError:
+                return False
+            except Exception as e:
+                print(f"Voice error: {e}")
+                return False
+        if self.cancelled:
+            return False
+        self.sound = pygame.mixer.Sound(file=io.BytesIO(data))
+        self.envelope = _envelope(self.sound)
+        return True
+
+def _envelope(sound):
+    """Peak level (0..1) per ENVELOPE_WINDOW of a 16-bit mixer sound."""
+    init = pygame.mixer.get_init()
+    if not init or abs(init[1]) != 16:
+        return []
+    samples = np.frombuffer(sound.get_raw(), np.int16)
+    window = max(1, int(init[0] * ENVELOPE_WINDOW) * init[2])
+    padded = np.zeros(-(-len(samples) // window) * window, np.int32)
+    padded[:len(samples)] = np.abs(samples.astype(np.int32))
+    return (padded.reshape(-1, window).max(axis=1) / 32768).tolist()
+
+class AudioEngine:
+    """In-process playback on pygame.mixer with a queue, interrupt and cancel.
+
+    Audio is decoded from in-memory bytes (no temp files, no ffplay). A small
+    driver thread plays queued clips back to back on one reserved channel; the
+    render loop can read `speaking` and `level()` every frame.
+    The mixer (and the audio device) is only opened when the first clip is
+    queued.
+    """
+
+    def __init__(self, on_state_change=None):
+        self.on_state_change = on_state_change
+        self._available = None
+        self.channel = None
+        self._queue = deque()
+        self._current = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    @property
+    def available(self):
+        if self._available is None:
+            self._available = self._init_mixer()
+            if self._available:
+                pygame.mixer.set_reserved(1)
+                self.channel = pygame.mixer.Channel(0)
+        return self._available
+
+    def _init_mixer(self):
+        try:
+            if not pygame.mixer.get_init():
+                pygame.mixer.init()
+            return True
+        except pygame.error as e:
+            print(f"Audio unavailable, continuing text-only: {e}")
+            return False
+
+    @property
+    def speaking(self):
+        return self._current is not None
+
+    def level(self):
+        """Loudness of the audio playing right now (0..1); drives the voice meter next to Rita."""
+        current = self._current
+        if current is None or current.started is None or not current.envelope:
+            return 0.0
+        index = int((time.perf_counter() - current.started) / ENVELOPE_WINDOW)
+        return current.envelope[index] if index < len(current.envelope) else 0.0
+
+    def enqueue(self, source, on_start=None):
+        """Queue audio bytes (any format pygame can sniff) or a Future of them.
+
+        Returns the Clip; its `done` event fires after playback (or when it is
+        skipped), and `on_start(clip)` is called when it becomes audible.
+        """
+        clip = Clip(source, on_start)
+        if not self.available:
+            clip.done.set()
+            return clip
+        with self._lock:
+            self._queue.append(clip)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audio", daemon=True)
+            self._thread.start()
+        self._wakeup.set()
+        return clip
+
+    def interrupt(self):
+        """Stop the clip that is playing now; queued clips continue."""
+        if self.channel is not None:
+            self.channel.stop()
+
+    def cancel_all(self):
+        """Stop playback and drop everything queued."""
+        with self._lock:
+            dropped = list(self._queue)
+            self._queue.clear()
+        for clip in dropped:
+            clip.cancel()
+            clip.done.set()
+        self.interrupt()
+
+    def _notify(self):
+        if self.on_state_change:
+            self.on_state_change()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            with self._lock:
+                clip = self._queue[0] if self._queue else None
+                if clip is None:
+                    self._wakeup.clear()
+                    continue
+            # Decoded while still queued, so cancel_all() can drop it meanwhile
+            try:
+                playable = clip.decode()
+            except pygame.error as e:
+                print(f"Voice error: {e}")
+                playable = False
+            with self._lock:
+                if self._queue and self._queue[0] is clip:
+                    self._queue.popleft()
+                playable = playable and not clip.cancelled
+            if not playable:
+                clip.done.set()
+                continue
+            self._current = clip
+            self.channel.play(clip.sound)
+            clip.started = time.perf_counter()
+            if clip.on_start:
+                clip.on_start(clip)
+            self._notify()
+            while self.channel.get_busy():
+                time.sleep(0.01)
+            self._current = None
+            clip.done.set()
+            self._notify()
+
+    def shutdown(self):
+        self.cancel_all()
@@ -0,0 +1,354 @@
+# benchmark.py
+"""Headless benchmarks for the render loop, chat layout and prompt building.
+
+    python benchmark.py                      # run and compare with data/benchmark_baseline.json
+    python benchmark.py --filter frame       # only the cases whose name contains "frame"
+    python benchmark.py --update-baseline    # record this machine's numbers as the new baseline
+    python benchmark.py --output bench.json  # also write the results as JSON
+
+Runs with SDL's dummy video/audio drivers, the fake LLM backend and offline
+TTS, so it needs no display, audio device or network. A case regresses when its
+median is more than `threshold` (relative) and `min_delta_ms` (absolute) slower
+than the baseline, or when a recorded size (prompt characters, wrapped lines)
+grows by more than `threshold`; the exit status is 1 if anything regressed.
+"""
+import gc
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import statistics
+
+# Before pygame/game are imported: no window, no sound card, no API calls
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+os.environ["LLM_Backend"] = "fake"
+os.environ["TTS_Engine"] = "offline"
+os.environ["Voice_Mode"] = "0"
+os.environ.pop("Prompt_Log", None)
+os.environ["Memory"] = "0"  # the game's own builder must not read or write a player's memory file
+
+BASELINE_PATH = os.path.join("data", "benchmark_baseline.json")
+DEFAULT_THRESHOLD = 0.5  # machines differ; this catches real regressions, not noise
+DEFAULT_MIN_DELTA_MS = 0.25  # sub-millisecond cases jitter by more than their own relative threshold
+
+MESSAGE_WORDS = (10, 50, 200, 1000)
+HISTORY_SIZES = (10, 100, 1000)
+PROMPT_HISTORY_SIZES = (0, 10, 100, 1000)
+MEMORY_SIZES = (100, 1000, 10000)
+
+WORDS = ("coffee espresso latte croissant trust memory circuit rain window neon war humans "
+         "android waitress sugar milk quiet regular order table counter story sip").split()
+
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+def make_history(count, seed=0):
+    rng = random.Random(seed)
+    return [{"role": "user" if i % 2 else "assistant", "content": sentence(rng, rng.randint(5, 60))}
+            for i in range(count)]
+
+def measure(fn, repeat, setup=None):
+    """Median/p95/min of `fn()` in milliseconds; `setup()` runs untimed before every call.
+
+    The garbage collector is paused while timing (as timeit does), so a
+    collection triggered by an earlier case doesn't land in this one.
+    """
+    times = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            if setup:
+                setup()
+            started = time.perf_counter()
+            fn()
+            times.append((time.perf_counter() - started) * 1000)
+    finally:
+        gc.enable()
+    times.sort()
+    return {
+        "median_ms": round(statistics.median(times), 4),
+        "p95_ms": round(times[min(len(times) - 1, int(round(0.95 * (len(times) - 1))))], 4),
+        "min_ms": round(times[0], 4),
+        "runs": repeat,
+    }
+
+class Suite:
+    """Registered cases, run in order; each returns a measure() dict, optionally with "size"/"info"."""
+
+    def __init__(self, scale=1.0, name_filter=None):
+        self.scale = scale
+        self.name_filter = name_filter
+        self.results = {}
+
+    def repeat(self, count):
+        return max(3, int(count * self.scale))
+
+    def wants(self, name):
+        return not self.name_filter or self.name_filter in name
+
+    def record(self, name, result):
+        self.results[name] = result
+        print(f"  {name:<32} {result['median_ms']:>10.3f} ms  (p95 {result['p95_ms']:.3f})", flush=True)
+
+def bench_wrap(suite, game):
+    from chat_layout import render_text_with_wrap
+    font, width = game.font, game.layout.chat_wrap_width
+    for words in MESSAGE_WORDS:
+        rng = random.Random(words)
+        name = f"wrap.{words}w.cached"
+        if suite.wants(name):
+            text = sentence(rng, words)
+            render_text_with_wrap(text, font, game.BLACK, width)
+            suite.record(name, measure(lambda: render_text_with_wrap(text, font, game.BLACK, width), suite.repeat(200)))
+        name = f"wrap.{words}w"
+        if suite.wants(name):
+            # A new text every run: word widths and line surfaces are not cached yet
+            texts = iter([" ".join(f"{rng.choice(WORDS)}{rng.randrange(10**6)}" for _ in range(words))
+                          for _ in range(suite.repeat(60))])
+            current = {}
+            result = measure(lambda: render_text_with_wrap(current["text"], font, game.BLACK, width),
+                             suite.repeat(60), setup=lambda: current.update(text=next(texts)))
+            result["size"] = {"lines": len(render_text_with_wrap(current["text"], font, game.BLACK, width))}
+            suite.record(name, result)
+
+def use_history(game, history):
+    game.full_history = history
+    game.chat_view.set_history(history)
+    game.update_chat_display()
+
+def bench_chat_display(suite, game):
+    rng = random.Random(1)
+    for size in HISTORY_SIZES:
+        name = f"chat.append.{size}"
+        if suite.wants(name):
+            # One new message on top of an already laid out history (the per-turn cost)
+            use_history(game, make_history(size))
+            append = lambda: game.full_history.append({"role": "assistant", "content": sentence(rng, 40)})
+            suite.record(name, measure(game.update_chat_display, suite.repeat(100), setup=append))
+        name = f"chat.stream.{size}"
+        if suite.wants(name):
+            # A streaming reply growing by one chunk per call
+            use_history(game, make_history(size))
+            game.full_history.append({"role": "assistant", "content": ""})
+            grow = lambda: game.full_history[-1].update(content=game.full_history[-1]["content"] + " " + rng.choice(WORDS))
+            suite.record(name, measure(game.update_chat_display, suite.repeat(100), setup=grow))
+        name = f"chat.relayout.{size}"
+        if suite.wants(name):
+            # Every message wrapped again, as after a resize or a replaced history
+            history = make_history(size)
+            suite.record(name, measure(lambda: use_history(game, history), suite.repeat(20 if size < 1000 else 10)))
+
+def bench_frames(suite, game):
+    states = (
+        ("start", game.STATE_START, None),
+        ("info", game.STATE_INFO, None),
+        ("chat", game.STATE_CHAT, 100),
+        ("chat.1000", game.STATE_CHAT, 1000),
+    )
+    for label, state, history in states:
+        game.game_state = state
+        if history is not None:
+            use_history(game, make_history(history))
+        name = f"frame.{label}.full"
+        if suite.wants(name):
+            # Everything repainted, as after a state change or resize
+            suite.record(name, measure(lambda: game.run_frame([], 0.0), suite.repeat(30), setup=game.renderer.invalidate))
+        name = f"frame.{label}"
+        if suite.wants(name):
+            game.run_frame([], 0.0)
+            suite.record(name, measure(lambda: game.run_frame([], 0.0), suite.repeat(200)))
+
+    name = "frame.chat.typewriter"
+    if suite.wants(name):
+        use_history(game, make_history(100))
+        reply = {"role": "assistant", "content": sentence(random.Random(2), 200)}
+
+        def restart_if_done():
+            if not game.is_typing:
+                game.full_history.append(reply.copy())
+                game.update_chat_display()
+                game.start_typewriter(game.full_history[-1])
+
+        # One character revealed per frame
+        step = 1 / game.TYPING_SPEED
+        suite.record(name, measure(lambda: game.run_frame([], step), suite.repeat(200), setup=restart_if_done))
+        game.finish_typewriter()
+    game.game_state = game.STATE_START
+
+def bench_layout(suite, game):
+    import pygame
+    name = "layout.resize"
+    if not suite.wants(name):
+        return
+    game.game_state = game.STATE_CHAT
+    use_history(game, make_history(100))
+    sizes = iter([(1280, 720), (1500, 750)] * suite.repeat(10))
+    original = game.screen.get_size()
+
+    def resize():
+        pygame.display.set_mode(next(sizes), pygame.RESIZABLE)
+
+    # New rects and fonts, re-wrapped history and (cached) scaled assets, then a full frame
+    suite.record(name, measure(lambda: (game.apply_layout(*pygame.display.get_surface().get_size()), game.run_frame([], 0.0)),
+                               suite.repeat(20), setup=resize))
+    pygame.display.set_mode(original, pygame.RESIZABLE)
+    game.apply_layout(*original)
+    game.game_state = game.STATE_START
+
+def bench_prompt(suite):
+    from prompt import get_system_prompt
+    from prompt_builder import PromptBuilder, count_tokens
+    count_tokens("load the tokenizer")  # lazy; not part of any case
+    for size in PROMPT_HISTORY_SIZES:
+        history = make_history(size, seed=size)
+        user_input = "Do you remember what I ordered last time?"
+        name = f"prompt.build.{size}"
+        if suite.wants(name):
+            # A fresh builder: a returning conversation's first prompt (summary built from scratch)
+            result = measure(lambda: PromptBuilder(log_path=None).build(user_input, history), suite.repeat(20))
+            builder = PromptBuilder(log_path=None)
+            messages = builder.build(user_input, history)
+            result["size"] = {"prompt_chars": builder.last_stats["prompt_chars"], "system_chars": len(messages[0]["content"])}
+            result["info"] = {key: builder.last_stats[key] for key in ("total_tokens", "messages", "evicted_messages")}
+            suite.record(name, result)
+        name = f"prompt.next_turn.{size}"
+        if suite.wants(name):
+            # The same builder one turn later: only the newly evicted turns are summarized
+            builder = PromptBuilder(log_path=None)
+            builder.build(user_input, history)
+            grown = list(history)
+            rng = random.Random(size)
+
+            def next_turn():
+                grown.extend([{"role": "user", "content": sentence(rng, 12)}, {"role": "assistant", "content": sentence(rng, 30)}])
+            suite.record(name, measure(lambda: builder.build(user_input, grown), suite.repeat(50), setup=next_turn))
+        name = f"prompt.next_turn.memory.{size}"
+        if suite.wants(name):
+            # With a memory index: recent window + recalled exchanges, whatever the history length
+            from memory import MemoryIndex
+            builder = PromptBuilder(log_path=None, memory=MemoryIndex())
+            builder.build(user_input, history)
+            grown = list(history)
+            rng = random.Random(size)
+
+            def next_turn():
+                grown.extend([{"role": "user", "content": sentence(rng, 12)}, {"role": "assistant", "content": sentence(rng, 30)}])
+            result = measure(lambda: builder.build(user_input, grown), suite.repeat(50), setup=next_turn)
+            result["size"] = {"prompt_chars": builder.last_stats["prompt_chars"]}
+            result["info"] = {"total_tokens": builder.last_stats["total_tokens"], "messages": builder.last_stats["messages"]}
+            suite.record(name, result)
+    name = "prompt.system"
+    if suite.wants(name):
+        summary = "\n".join(f"- user: {sentence(random.Random(i), 12)}" for i in range(50))
+        result = measure(lambda: get_system_prompt(summary), suite.repeat(500))
+        result["size"] = {"chars": len(get_system_prompt()), "chars_with_summary": len(get_system_prompt(summary))}
+        suite.record(name, result)
+
+def bench_memory(suite):
+    from memory import MemoryIndex
+    for size in MEMORY_SIZES:
+        name = f"memory.search.{size}"
+        if not suite.wants(name):
+            continue
+        rng = random.Random(size)
+        index = MemoryIndex()
+        for _ in range(size):
+            index.add(sentence(rng, 12), sentence(rng, 30))
+        queries = iter([sentence(rng, 8) for _ in range(suite.repeat(100))])
+        current = {}
+        suite.record(name, measure(lambda: index.search(current["query"]), suite.repeat(100),
+                                   setup=lambda: current.update(query=next(queries))))
+
+def run(args):
+    suite = Suite(scale=args.scale, name_filter=args.filter)
+    print("Prompt building:")
+    bench_prompt(suite)
+    print("Memory recall:")
+    bench_memory(suite)
+
+    print("Loading the game headless...")
+    import pygame
+    import game
+    for group, bench in (("Text wrapping", bench_wrap), ("Chat display", bench_chat_display),
+                         ("Frames", bench_frames), ("Layout", bench_layout)):
+        print(f"{group}:")
+        bench(suite, game)
+    game.shutdown()
+    pygame.quit()
+    return suite.results
+
+def environment():
+    import pygame
+    return {"python": platform.python_version(), "pygame": pygame.version.ver,
+            "platform": platform.platform(), "machine": platform.machine()}
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Print current vs baseline per case; return the names that regressed."""
+    regressions = []
+    print(f"\n{'case':<32} {'median ms':>10} {'baseline':>10} {'change':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<32} {result['median_ms']:>10.3f} {'-':>10} {'new':>8}")
+            continue
+        change = result["median_ms"] / base["median_ms"] - 1 if base["median_ms"] else 0.0
+        slower = change > threshold and result["median_ms"] - base["median_ms"] > min_delta_ms
+        grown = [key for key, value in result.get("size", {}).items()
+                 if key in base.get("size", {}) and value > base["size"][key] * (1 + threshold)]
+        flag = ""
+        if slower or grown:
+            regressions.append(name)
+            flag = "  REGRESSION" + (f" (size: {', '.join(grown)})" if grown else "")
+        print(f"{name:<32} {result['median_ms']:>10.3f} {base['median_ms']:>10.3f} {change:>+8.0%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless render-loop, layout and prompt benchmarks.")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file to compare with (or write)")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, help="allowed relative slowdown (default: from the baseline file)")
+    parser.add_argument("--filter", help="only run cases whose name contains this")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the repetition counts (e.g. 0.2 for a quick run)")
+    parser.add_argument("--output", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    results = run(args)
+    document = {"time": time.time(), "environment": environment(), "results": results}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    if args.update_baseline:
+        previous = baseline or {}
+        if args.filter and baseline:
+            results = {**baseline["results"], **results}  # a filtered run only replaces its own cases
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"threshold": previous.get("threshold", DEFAULT_THRESHOLD),
+                       "min_delta_ms": previous.get("min_delta_ms", DEFAULT_MIN_DELTA_MS),
+                       **document, "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+        return
+
+    if baseline is None:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to create one.")
+        return
+    threshold = args.threshold if args.threshold is not None else baseline.get("threshold", DEFAULT_THRESHOLD)
+    regressions = compare(results, baseline["results"], threshold, baseline.get("min_delta_ms", DEFAULT_MIN_DELTA_MS))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {threshold:.0%}.")
+
+if __name__ == "__main__":
+    main()
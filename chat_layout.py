@@ -0,0 +1,59 @@
+from collections import OrderedDict
+
+class TextWrapper:
+    """Greedy word wrap for one font, measuring every distinct word only once."""
+
+    def __init__(self, font, max_cached_words=20000):
+        self.font = font
+        self.space_width = font.size(" ")[0]
+        self.max_cached_words = max_cached_words
+        self._word_widths = {}
+
+    def word_width(self, word):
+        width = self._word_widths.get(word)
+        if width is None:
+            if len(self._word_widths) >= self.max_cached_words:
+                self._word_widths.clear()
+            width = self.font.size(word)[0]
+            self._word_widths[word] = width
+        return width
+
+    def wrap(self, text, max_width):
+        """Split text into lines no wider than max_width (a single long word gets its own line)."""
+        lines = []
+        current_line = []
+        line_width = 0
+
+        for word in text.split(' '):
+            width = self.word_width(word)
+            new_width = line_width + self.space_width + width if current_line else width
+            if new_width <= max_width:
+                current_line.append(word)
+                line_width = new_width
+            elif current_line:
+                lines.append(' '.join(current_line))
+                current_line = [word]
+                line_width = width
+            else:
+                lines.append(word)
+
+        if current_line:
+            lines.append(' '.join(current_line))
+        return lines
+
+# Fonts are recreated on every resize, so only the most recently used few keep a wrapper
+MAX_WRAPPERS = 4
+_wrappers = OrderedDict()  # font -> TextWrapper, oldest first
+
+def get_wrapper(font):
+    wrapper = _wrappers.get(font)
+    if wrapper is None:
+        wrapper = _wrappers[font] = TextWrapper(font)
+        while len(_wrappers) > MAX_WRAPPERS:
+            _wrappers.popitem(last=False)
+    else:
+        _wrappers.move_to_end(font)
+    return wrapper
+
+def render_text_with_wrap(text, font, color, max_width):
+    return [font.render(line, True, color) for line in get_wrapper(font).wrap(text, max_width)]
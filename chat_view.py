@@ -0,0 +1,203 @@
+from bisect import bisect_right
+from collections import OrderedDict
+from chat_layout import get_wrapper
+
+class ChatView:
+    """Scrollable view over the whole chat history that only draws what is on screen.
+
+    Every message is wrapped into plain text lines once and its height goes into
+    a prefix-sum index (`_tops`), so the content height, the scroll limits and
+    the first visible message are all cheap to find. Line surfaces are rendered
+    lazily for lines that intersect the viewport and kept in an LRU bounded by
+    `max_surface_bytes`.
+    """
+
+    def __init__(self, history, font, line_height, width, height, speaker_styles, text_color,
+                 padding=10, max_surface_bytes=32 * 1024 * 1024):
+        self.history = history
+        self.font = font
+        self.line_height = line_height
+        self.width = width
+        self.height = height
+        self.speaker_styles = speaker_styles  # speaker or role -> (label, color); missing ones use "assistant"
+        self.text_color = text_color
+        self.padding = padding
+        self.max_surface_bytes = max_surface_bytes
+        self.scroll_offset = 0
+        self.follow = True  # stick to the newest message until the player scrolls up
+        self.reveal_message = None  # typewriter: message being revealed and how many of its characters show
+        self.reveal = 0
+        self.revision = 0  # bumped whenever the laid-out content changes
+        self._speaker_surfaces = {}
+        self._reset()
+
+    def _reset(self):
+        self.revision += 1
+        self._messages = []  # message dicts we have laid out, parallel to history
+        self._layouts = []   # (content, [line strings]) per message
+        self._tops = [0]     # _tops[i] = y of message i; _tops[-1] = total content height
+        self._surfaces = OrderedDict()  # (message index, line index) -> Surface
+        self._surface_bytes = 0
+
+    def set_history(self, history):
+        self.history = history
+        self.reveal_message = None
+        self._reset()
+        self.scroll_offset = 0
+        self.follow = True
+
+    def resize(self, width, height, font=None, line_height=None):
+        """Re-wrap for a new wrap width, viewport height, font or line height."""
+        font = font or self.font
+        line_height = line_height or self.line_height
+        self.height = height
+        if width != self.width or font is not self.font or line_height != self.line_height:
+            # Keep the same relative scroll position unless we were following the bottom
+            fraction = self.scroll_offset / max(1, self.content_height())
+            self.width = width
+            self.font = font
+            self.line_height = line_height
+            self._speaker_surfaces = {}
+            self._reset()
+            self.sync()
+            if not self.follow:
+                self.scroll_offset = min(self.max_scroll(), round(fraction * self.content_height()))
+        self.sync()
+
+    def _speaker(self, msg):
+        # NPC replies carry a "speaker" (their id); everything else is styled by role
+        key = msg.get("speaker", msg["role"])
+        if key not in self._speaker_surfaces:
+            label, color = self.speaker_styles.get(key, self.speaker_styles["assistant"])
+            self._speaker_surfaces[key] = self.font.render(f"{label}: ", True, color)
+        return self._speaker_surfaces[key]
+
+    def _layout(self, msg):
+        wrap_width = self.width - self._speaker(msg).get_width()
+        lines = get_wrapper(self.font).wrap(msg["content"], wrap_width)
+        return msg["content"], lines
+
+    def _message_height(self, layout):
+        # Speaker row + text rows + half a line of spacing
+        return (1 + len(layout[1])) * self.line_height + self.line_height // 2
+
+    def _drop_surfaces(self, index, line_count):
+        for k in range(line_count):
+            surface = self._surfaces.pop((index, k), None)
+            if surface is not None:
+                self._surface_bytes -= surface.get_bytesize() * surface.get_width() * surface.get_height()
+
+    def _relayout(self, index):
+        """Re-wrap one message whose text changed and shift everything below it."""
+        old = self._layouts[index]
+        self._drop_surfaces(index, len(old[1]))
+        self._layouts[index] = self._layout(self._messages[index])
+        delta = self._message_height(self._layouts[index]) - self._message_height(old)
+        for j in range(index + 1, len(self._tops)):
+            self._tops[j] += delta
+
+    def sync(self, edited=()):
+        """Pick up appended messages and edits to the last one (e.g. a streaming reply).
+
+        Messages in `edited` are checked too, for replies that keep streaming
+        after other messages were appended below them.
+        """
+        history = self.history
+        count = len(self._messages)
+        if len(history) < count or (count and history[count - 1] is not self._messages[-1]):
+            self._reset()
+            count = 0
+
+        changed = False
+        # The newest message may still be growing while a reply streams in
+        if count and self._layouts[-1][0] != history[count - 1]["content"]:
+            self._relayout(count - 1)
+            changed = True
+        for msg in edited:
+            # Streaming messages are near the bottom, so search from there
+            index = next((i for i in range(count - 1, -1, -1) if self._messages[i] is msg), None)
+            if index is not None and self._layouts[index][0] != msg["content"]:
+                self._relayout(index)
+                changed = True
+
+        for msg in history[count:]:
+            layout = self._layout(msg)
+            self._messages.append(msg)
+            self._layouts.append(layout)
+            self._tops.append(self._tops[-1] + self._message_height(layout))
+            changed = True
+
+        if changed:
+            self.revision += 1
+        if changed and self.follow:
+            self.scroll_offset = self.max_scroll()
+        self.scroll_offset = min(self.scroll_offset, self.max_scroll())
+        return changed
+
+    def content_height(self):
+        return self._tops[-1]
+
+    def max_scroll(self):
+        return max(0, self.content_height() - self.height + 2 * self.padding)
+
+    def scroll_by(self, dy):
+        self.scroll_offset = max(0, min(self.max_scroll(), self.scroll_offset + dy))
+        self.follow = self.scroll_offset >= self.max_scroll()
+
+    def _line_surface(self, index, k, text):
+        key = (index, k)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            return surface
+        surface = self.font.render(text, True, self.text_color)
+        self._surfaces[key] = surface
+        self._surface_bytes += surface.get_bytesize() * surface.get_width() * surface.get_height()
+        while self._surface_bytes > self.max_surface_bytes and len(self._surfaces) > 1:
+            _, old = self._surfaces.popitem(last=False)
+            self._surface_bytes -= old.get_bytesize() * old.get_width() * old.get_height()
+        return surface
+
+    def _prefix_width(self, text, count):
+        if hasattr(self.font, "prefix_width"):
+            return self.font.prefix_width(text, count)
+        return self.font.size(text[:count])[0]
+
+    def draw(self, screen, rect):
+        """Blit the lines that intersect rect; cost depends on the viewport, not the history."""
+        view_top = self.scroll_offset - self.padding
+        view_bottom = view_top + rect.height
+        origin_y = rect.y - view_top
+
+        previous_clip = screen.get_clip()
+        screen.set_clip(rect.clip(previous_clip))
+        index = max(0, bisect_right(self._tops, view_top) - 1)
+        while index < len(self._layouts) and self._tops[index] < view_bottom:
+            top = self._tops[index]
+            if top + self.line_height > view_top:
+                screen.blit(self._speaker(self._messages[index]), (rect.x + 20, origin_y + top))
+            remaining = self.reveal if self._messages[index] is self.reveal_message else None
+            for k, text in enumerate(self._layouts[index][1]):
+                line_y = top + (k + 1) * self.line_height
+                if line_y >= view_bottom or remaining is not None and remaining <= 0:
+                    break
+                if line_y + self.line_height > view_top:
+                    surface = self._line_surface(index, k, text)
+                    area = None
+                    if remaining is not None and remaining < len(text):
+                        # Partly revealed line: the same cached surface, clipped
+                        area = (0, 0, self._prefix_width(text, remaining), surface.get_height())
+                    screen.blit(surface, (rect.x + 20, origin_y + line_y), area)
+                if remaining is not None:
+                    remaining -= len(text) + 1  # the space the wrap consumed
+            index += 1
+        screen.set_clip(previous_clip)
+
+    def scrollbar_rect(self, rect):
+        """(x, y, w, h) of the scrollbar thumb, or None when everything fits."""
+        total = self.content_height() + 2 * self.padding
+        if total <= rect.height:
+            return None
+        bar_height = max(30, rect.height * rect.height / total)  # Minimum height of 30px
+        bar_pos = (self.scroll_offset / self.max_scroll()) * (rect.height - bar_height)
+        return (rect.right - 10, rect.y + bar_pos, 8, bar_height)
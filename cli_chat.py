@@ -1,14 +1,165 @@
 # cli_chat.py
-from llm import llm
+"""Talk to Rita in the terminal, or replay scripted conversations as a load test.
+
+    python cli_chat.py                                   # interactive, streamed replies
+    python cli_chat.py --batch data/sample_conversations.jsonl --sessions 50 --concurrency 10
+    python cli_chat.py --backend fake --batch ...        # offline stand-in instead of the Mistral API
+
+A batch file is JSON lines ({"name": ..., "turns": ["...", ...]}) or plain text
+with one player line per row and conversations separated by blank lines.
+"""
+import os
+import sys
+import json
+import time
 import asyncio
+import argparse
+from collections import Counter
+
+def load_conversations(path):
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith(".jsonl"):
+        return [json.loads(line)["turns"] for line in text.splitlines() if line.strip()]
+    blocks = [block.strip() for block in text.split("\n\n")]
+    return [[line.strip() for line in block.splitlines() if line.strip()] for block in blocks if block]
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+class LoadReport:
+    """Per-turn measurements from a batch run."""
+
+    def __init__(self):
+        self.first_chunk = []
+        self.total = []
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.turns = 0
+        self.local_turns = 0
+        self.errors = Counter()
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        ms = lambda values, q: None if not values else round(percentile(values, q) * 1000, 1)
+        return {
+            "turns": self.turns,
+            "llm_turns": self.turns - self.local_turns,
+            "errors": sum(self.errors.values()),
+            "error_rate": round(sum(self.errors.values()) / self.turns, 4) if self.turns else 0.0,
+            "error_types": dict(self.errors),
+            "seconds": round(elapsed, 2),
+            "turns_per_sec": round(self.turns / elapsed, 2) if elapsed else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "completion_tokens_per_sec": round(self.completion_tokens / elapsed, 1) if elapsed else 0.0,
+            "first_chunk_ms": {f"p{q}": ms(self.first_chunk, q) for q in (50, 90, 95, 99)},
+            "total_ms": {f"p{q}": ms(self.total, q) for q in (50, 90, 95, 99)},
+        }
+
+async def run_conversation(turns, report, limiter, use_intents):
+    async with limiter:
+        await _replay(turns, report, use_intents)
 
-async def main():
+async def _replay(turns, report, use_intents):
+    from session import Session
+    from prompt_builder import count_tokens
+
+    session = Session()
+    if not use_intents:
+        session.intents = None
+    for message in turns:
+        report.turns += 1
+        started = time.perf_counter()
+        first = None
+        try:
+            async for _ in session.turn(message):
+                if first is None:
+                    first = time.perf_counter() - started
+        except Exception as e:
+            report.errors[type(e).__name__] += 1
+            continue
+        report.total.append(time.perf_counter() - started)
+        if first is not None:
+            report.first_chunk.append(first)
+        if session.last_intent:
+            report.local_turns += 1  # answered by a scripted intent, no prompt was sent
+        else:
+            report.prompt_tokens += session.builder.last_stats["total_tokens"]
+            report.completion_tokens += count_tokens(session.history[-1]["content"])
+
+async def run_batch(args):
+    conversations = load_conversations(args.batch)
+    if not conversations:
+        sys.exit(f"No conversations in {args.batch}")
+    sessions = args.sessions or len(conversations)
+    limiter = asyncio.Semaphore(args.concurrency)
+    report = LoadReport()
+    print(f"Replaying {sessions} sessions ({len(conversations)} scripts) with concurrency {args.concurrency}...")
+    await asyncio.gather(*(run_conversation(conversations[i % len(conversations)], report, limiter, not args.no_intents)
+                           for i in range(sessions)))
+    report.finished = time.perf_counter()
+
+    from llm import close_client
+    from metrics import metrics
+    await close_client()
+    metrics.export()  # LLM histograms, when Metrics=1 and Metrics_Export are set
+    summary = report.summary()
+    print(json.dumps(summary, indent=2))
+    if args.report:
+        with open(args.report, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"time": time.time(), "file": args.batch, "concurrency": args.concurrency, **summary}) + "\n")
+    return summary
+
+async def run_interactive():
+    from session import Session
+    from prompt import GREETING
+    from llm import close_client
+    from memory import MemoryIndex, MEMORY, PLAYER_ID
+
+    session = Session(memory=MemoryIndex.for_player(PLAYER_ID) if MEMORY and PLAYER_ID else None)
     print("Welcome to The Sentient Sip! (Type 'quit' to exit)")
-    while True:
-        user_input = input("You: ")
-        if user_input.lower() == "quit":
-            break
-        response = await llm(user_input)
-        print(f"Rita: {response}")
-
-asyncio.run(main())
\ No newline at end of file
+    print(f"Rita: {GREETING}")
+    try:
+        while True:
+            try:
+                user_input = await asyncio.to_thread(input, "You: ")
+            except EOFError:
+                break
+            if user_input.lower() == "quit":
+                break
+            if not user_input.strip():
+                continue
+            print("Rita: ", end="", flush=True)
+            try:
+                async for chunk in session.turn(user_input.strip()):
+                    print(chunk, end="", flush=True)
+                print()
+            except Exception as e:
+                print(f"\n[Error getting response: {e}]")
+    finally:
+        await close_client()
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat with Rita, or load-test the backend with scripted conversations.")
+    parser.add_argument("--batch", help="file of scripted conversations to replay")
+    parser.add_argument("--sessions", type=int, help="number of sessions to run (default: one per script)")
+    parser.add_argument("--concurrency", type=int, default=8, help="sessions talking at the same time")
+    parser.add_argument("--backend", choices=["mistral", "fake", "record", "replay"], help="overrides LLM_Backend")
+    parser.add_argument("--no-intents", action="store_true", help="send scripted café lines to the LLM too")
+    parser.add_argument("--report", help="append the summary as one JSON line to this file")
+    args = parser.parse_args()
+    if args.backend:
+        os.environ["LLM_Backend"] = args.backend  # read when llm.py is first imported
+    if args.batch:
+        asyncio.run(run_batch(args))
+    else:
+        asyncio.run(run_interactive())
+
+if __name__ == "__main__":
+    main()
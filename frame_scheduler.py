@@ -0,0 +1,47 @@
+import pygame
+
+class AdaptiveFrameScheduler:
+    """Decides when the next frame runs.
+
+    While something animates the loop runs at `max_fps` like before. When the
+    UI is idle it blocks in pygame.event.wait until input arrives, a worker
+    calls `wake()`, or the next animation deadline (e.g. cursor blink) is due.
+    """
+
+    def __init__(self, max_fps=60, max_idle_ms=1000):
+        self.max_fps = max_fps
+        self.max_idle_ms = max_idle_ms
+        self.wake_event = pygame.event.custom_type()
+        self.clock = pygame.time.Clock()
+        self._last_ticks = pygame.time.get_ticks()
+
+    def wake(self):
+        """Interrupt an idle wait; safe to call from worker threads."""
+        try:
+            pygame.event.post(pygame.event.Event(self.wake_event))
+        except pygame.error:
+            pass  # display already shut down
+
+    def next_frame(self, animating, deadline_ms=None):
+        """Wait for the next frame and return (events, dt_seconds).
+
+        `deadline_ms` is the pygame tick at which something on screen changes
+        on its own; ignored while `animating` is true.
+        """
+        if animating:
+            self.clock.tick(self.max_fps)
+            events = pygame.event.get()
+        else:
+            now = pygame.time.get_ticks()
+            timeout = self.max_idle_ms if deadline_ms is None else max(0, min(self.max_idle_ms, deadline_ms - now))
+            first = pygame.event.wait(timeout) if timeout > 0 else pygame.event.Event(pygame.NOEVENT)
+            events = [first] if first.type != pygame.NOEVENT else []
+            events.extend(pygame.event.get())
+            # Keep the clock's notion of "last frame" current for when animation resumes
+            self.clock.tick()
+
+        now = pygame.time.get_ticks()
+        # Cap dt so animations resuming after a long idle wait don't jump
+        dt = min(0.25, (now - self._last_ticks) / 1000.0)
+        self._last_ticks = now
+        return events, dt
@@ -1,24 +1,51 @@
+import time
+STARTUP_STARTED = time.perf_counter()  # for the startup report
+
 import pygame
 from pygame._sdl2 import Window
-from llm import invoke_model
-import asyncio
+from llm import warmup as warmup_llm
+from llm_worker import LLMWorker
+from chat_view import ChatView
+from renderer import LayeredRenderer
+from frame_scheduler import AdaptiveFrameScheduler
+from layout import Layout, ScaledAssetCache
+from tts import TTSPipeline
+from audio import AudioEngine
+from voice_capture import VoiceCaptureService
+from npc import Scene
+from scheduler import TaskScheduler
+from prewarm import Prewarmer
+from metrics import metrics
+from text_renderer import TextRenderer
 import os
-import time
 import math
-import speech_recognition as sr
-from gtts import gTTS
-import tempfile
-import subprocess
-import threading
-from queue import Queue
 
 # Initialize Pygame with larger window
 pygame.init()
 screen_width, screen_height = 1500, 750  # Increased window size
 screen = pygame.display.set_mode((screen_width, screen_height), pygame.RESIZABLE)
-Window.from_display_module().maximize()
+window = Window.from_display_module()  # keep it: SDL holds a borrowed pointer to it for event.window
+window.maximize()
 pygame.display.set_caption("The Sentient Sip")
-clock = pygame.time.Clock()
+
+def draw_splash(step=0):
+    """Lightweight loading screen (default font, no assets) shown until the real assets are ready."""
+    surface = pygame.display.get_surface()
+    surface.fill((20, 14, 10))
+    title = pygame.font.Font(None, 64).render("The Sentient Sip", True, (255, 200, 200))
+    dots = pygame.font.Font(None, 32).render("Loading" + "." * (step % 4), True, (150, 150, 150))
+    surface.blit(title, title.get_rect(center=(surface.get_width() // 2, surface.get_height() // 2 - 30)))
+    surface.blit(dots, (surface.get_width() // 2 - 45, surface.get_height() // 2 + 20))
+    pygame.display.flip()
+
+draw_splash()
+startup_times = {"window": time.perf_counter() - STARTUP_STARTED}
+
+# Full frame rate only while something animates; otherwise sleep until woken
+frame_scheduler = AdaptiveFrameScheduler(max_fps=60)
+
+# Static layers + dirty-rect updates instead of redrawing the whole scene
+renderer = LayeredRenderer(screen)
 
 # Colors
 WHITE = (255, 255, 255)
@@ -32,39 +59,62 @@ YELLOW_GLOW = (255, 255, 0, 30)
 SEMI_TRANSPARENT = (200, 200, 200, 150)  # Light gray with alpha transparency
 
 # Chat system constants
-MAX_VISIBLE_MESSAGES = 20  # Increased message history
-LINE_HEIGHT = 30
-TEXTBOX_HEIGHT = 400  # Reduced height
-TEXTBOX_WIDTH = screen_width - 50  # Increased width
 SCROLL_SPEED = 5  # Smoother scrolling
 
 # Voice mode
-voice_mode = False
+voice_mode = os.getenv("Voice_Mode", "0") == "1"  # start the chat in voice mode
 listening = False
 mic_animation_frames = 0
 mic_animation_active = False
-voice_input_queue = Queue()
-llm_response_queue = Queue()
+
+# Bounded worker pools (network, stt, io); results come back through one channel that wakes the loop
+scheduler = TaskScheduler(on_ready=frame_scheduler.wake)
+
+# Decode the images in the background while the rest of startup runs behind the splash
+ASSET_FILES = {"bg": "assets/cafe_background.png", "rita": "assets/rita.png"}
+pending_assets = {name: scheduler.submit("io", pygame.image.load, path) for name, path in ASSET_FILES.items()}
+
+# Stream replies chunk by chunk instead of waiting for the whole message
+STREAM_RESPONSES = os.getenv("Stream_Responses", "1") != "0"
+
+# Single background event loop + pooled API client shared by every turn
+llm_worker = LLMWorker()
+llm_worker.start()
 
 # Load assets
-def load_asset(path, fallback_size=None, fallback_color=(255, 0, 255)):
+def finish_asset(name, fallback_size=None, fallback_color=(255, 0, 255), alpha=False):
     try:
-        return pygame.image.load(path)
-    except:
-        print(f"Could not load {path}, using fallback")
+        image = pending_assets[name].result()
+        # Match the display's pixel format once so blits don't convert every frame
+        return image.convert_alpha() if alpha else image.convert()
+    except Exception:
+        print(f"Could not load {ASSET_FILES[name]}, using fallback")
         if fallback_size:
             surface = pygame.Surface(fallback_size)
             surface.fill(fallback_color)
             return surface
         return None
 
-bg = load_asset("assets/cafe_background.png", (screen_width, screen_height), (200, 200, 200))
-rita = load_asset("assets/rita.png", (200, 400), (255, 0, 0))
-desired_width = 700
-desired_height = 700
-rita = pygame.transform.scale(load_asset("assets/rita.png"), (desired_width, desired_height))
-font = pygame.font.Font("assets/pixel_font.ttf", 24) if os.path.exists("assets/pixel_font.ttf") else pygame.font.SysFont("Arial", 24)
-title_font = pygame.font.Font("assets/pixel_font.ttf", 48) if os.path.exists("assets/pixel_font.ttf") else pygame.font.SysFont("Arial", 48)
+def wait_for_assets():
+    """Keep the splash responsive until every background decode has finished."""
+    clock = pygame.time.Clock()
+    step = 0
+    while not all(future.done() for future in pending_assets.values()):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                scheduler.shutdown()
+                pygame.quit()
+                raise SystemExit
+        step += 1
+        draw_splash(step // 10)
+        clock.tick(30)
+
+# Originals are decoded once; scaled copies are made once per window size (lazily, on first use)
+assets = ScaledAssetCache()
+
+def load_font(size):
+    # The bundled pixel font through a glyph atlas; falls back to Arial if the file is missing
+    return TextRenderer.load(size)
 
 # Game states
 STATE_START = 0
@@ -72,152 +122,180 @@ STATE_INFO = 1
 STATE_CHAT = 2
 game_state = STATE_START
 
-# UI Elements
-rita_rect = pygame.Rect(screen_width//2 - rita.get_width()//2, screen_height//2 - rita.get_height()//2, rita.get_width(), rita.get_height())
-start_button = pygame.Rect(screen_width//2 - 150, screen_height//2, 300, 80)
-info_button = pygame.Rect(screen_width//2 - 150, screen_height//2 + 100, 300, 80)
-back_button = pygame.Rect(50, 50, 200, 60)
-voice_button = pygame.Rect(screen_width - 200, 50, 150, 40)  # Adjusted size
-
 # Chat system
 full_history = []
-chat_lines = []
-scroll_offset = 0
 input_text = ""
 typing_progress = 0
 current_typing_text = ""
 is_typing = False
+TYPING_SPEED = 60  # characters per second for replies that arrive all at once
 waiting_for_llm = False
+pending_npcs = []  # NPCs still answering the current request
+streaming_messages = {}  # npc id -> the chat message its reply is streaming into
+
+# Who is in the café (Scene_NPCs); each NPC has its own persona, history, trust and memory
+scene = Scene()
+
+# Virtualized view over the whole history; only on-screen lines are rendered
+chat_view = None
 
-def render_text_with_wrap(text, font, color, max_width):
-    words = text.split(' ')
-    lines = []
-    current_line = []
+def apply_layout(width, height):
+    """Recompute every rect, font and scaled asset for a new window size."""
+    global screen, screen_width, screen_height, layout, font, title_font, bg, chat_view
+    global LINE_HEIGHT, TEXTBOX_WIDTH, TEXTBOX_HEIGHT, overlay_font
+    global rita_rect, start_button, info_button, back_button, voice_button, textbox_rect, input_rect
     
-    for word in words:
-        test_line = ' '.join(current_line + [word])
-        if font.size(test_line)[0] <= max_width:
-            current_line.append(word)
-        else:
-            if current_line:
-                lines.append(' '.join(current_line))
-                current_line = [word]
-            else:
-                lines.append(word)
-                current_line = []
+    screen = pygame.display.get_surface()
+    screen_width, screen_height = width, height
+    previous = layout if chat_view else None
+    layout = Layout(width, height)
     
-    if current_line:
-        lines.append(' '.join(current_line))
+    if previous is None or previous.font_size != layout.font_size:
+        font = load_font(layout.font_size)
+    if previous is None or previous.title_font_size != layout.title_font_size:
+        title_font = load_font(layout.title_font_size)
+    overlay_font = pygame.font.SysFont("monospace", max(10, round(14 * layout.scale)))
+    bg = assets.get("bg", (width, height), mode="cover")
     
-    surfaces = []
-    for line in lines:
-        surfaces.append(font.render(line, True, color))
-    return surfaces
-
-def update_chat_display():
-    global chat_lines, scroll_offset
+    LINE_HEIGHT = layout.line_height
+    TEXTBOX_WIDTH, TEXTBOX_HEIGHT = layout.textbox_rect.size
+    rita_rect = layout.rita_rect
+    start_button = layout.start_button
+    info_button = layout.info_button
+    back_button = layout.back_button
+    voice_button = layout.voice_button
+    textbox_rect = layout.textbox_rect
+    input_rect = layout.input_rect
     
-    chat_lines = []
-    y_offset = 0
-    
-    for msg in full_history[-MAX_VISIBLE_MESSAGES:]:
-        speaker = "You" if msg["role"] == "user" else "Rita"
-        speaker_color = BLUE if speaker == "You" else RED
-        
-        # Add speaker tag
-        speaker_surface = font.render(f"{speaker}: ", True, speaker_color)
-        chat_lines.append((speaker_surface, y_offset))
-        y_offset += LINE_HEIGHT
-        
-        # Add message text
-        wrapped_surfaces = render_text_with_wrap(
-            msg["content"], font, BLACK, 
-            TEXTBOX_WIDTH - 50 - speaker_surface.get_width()
+    if chat_view is None:
+        chat_view = ChatView(
+            full_history, font, LINE_HEIGHT, layout.chat_wrap_width, TEXTBOX_HEIGHT,
+            {"user": ("You", BLUE), "assistant": ("Rita", RED),
+             **{npc_id: (persona.name, persona.color) for npc_id, persona in scene.personas.items()}}, BLACK,
         )
-        for surface in wrapped_surfaces:
-            chat_lines.append((surface, y_offset))
-            y_offset += LINE_HEIGHT
-        
-        # Add space between messages
-        y_offset += LINE_HEIGHT // 2
-    
-    # Auto-scroll to bottom if not manually scrolling
-    max_offset = max(0, y_offset - TEXTBOX_HEIGHT + 20)  # +20 for padding
-    if scroll_offset > max_offset:
-        scroll_offset = max_offset
+    else:
+        chat_view.resize(layout.chat_wrap_width, TEXTBOX_HEIGHT, font, LINE_HEIGHT)
+    renderer.set_screen(screen)
+
+wait_for_assets()
+assets.add("bg", finish_asset("bg", (screen_width, screen_height), (200, 200, 200)))
+assets.add("rita", finish_asset("rita", (200, 400), (255, 0, 0), alpha=True))
+startup_times["assets"] = time.perf_counter() - STARTUP_STARTED
+
+layout = None
+apply_layout(*screen.get_size())
+
+def start_typewriter(message):
+    """Reveal a complete reply character by character (a clipped blit per frame, no relayout)."""
+    global is_typing, typing_progress, current_typing_text
+    is_typing, typing_progress, current_typing_text = True, 0, message["content"]
+    chat_view.reveal_message, chat_view.reveal = message, 0
+
+def finish_typewriter():
+    global is_typing
+    is_typing = False
+    chat_view.reveal_message = None
+
+def update_chat_display(edited=()):
+    chat_view.sync(edited)
+
+# Sentence-pipelined, cached speech output played in-process through pygame.mixer
+audio_engine = AudioEngine(on_state_change=frame_scheduler.wake)
+tts_pipeline = TTSPipeline(audio=audio_engine, scheduler=scheduler)
 
 def speak_async(text):
-    def _speak():
-        try:
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as fp:
-                tts = gTTS(text=text, lang="en")
-                tts.save(fp.name)
-            
-            subprocess.run(["ffplay", "-nodisp", "-autoexit", "-loglevel", "quiet", fp.name], 
-                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            os.unlink(fp.name)
-        except Exception as e:
-            print(f"Voice error: {e}")
-    
-    thread = threading.Thread(target=_speak)
-    thread.daemon = True
-    thread.start()
+    return tts_pipeline.speak(text)
+
+# Opened on first use of voice mode, then kept open (calibrated once, VAD endpointing)
+voice_capture = None
+
+def ensure_voice_capture():
+    global voice_capture
+    if voice_capture is None:
+        voice_capture = VoiceCaptureService(
+            on_result=lambda status, text: scheduler.post("voice", (status, text)),
+            on_state=frame_scheduler.wake,
+            scheduler=scheduler,
+        )
+        voice_capture.start()
+    return voice_capture
 
 def listen_async():
-    def _listen():
-        global mic_animation_active, listening
-        r = sr.Recognizer()
-        mic_animation_active = True
-        listening = True
-        
-        try:
-            with sr.Microphone() as source:
-                r.adjust_for_ambient_noise(source, duration=1)
-                audio = r.listen(source, timeout=5, phrase_time_limit=10)
-                result = r.recognize_google(audio)
-                voice_input_queue.put(("success", result))
-        except sr.UnknownValueError:
-            voice_input_queue.put(("error", "[Could not understand audio]"))
-        except sr.RequestError as e:
-            voice_input_queue.put(("error", f"[Speech service error: {e}]"))
-        except Exception as e:
-            voice_input_queue.put(("error", f"[Microphone error: {e}]"))
-        finally:
-            mic_animation_active = False
-            listening = False
-    
-    thread = threading.Thread(target=_listen)
-    thread.daemon = True
-    thread.start()
-
-def get_llm_response_async(message, chat_history=None):
-    def _get_response():
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            response = loop.run_until_complete(invoke_model(message, chat_history))
-            llm_response_queue.put(("success", response))
-        except Exception as e:
-            llm_response_queue.put(("error", f"Error getting response: {e}"))
-        finally:
-            loop.close()
+    ensure_voice_capture().arm()
+
+def wait_for_calibration(capture, timeout=10):
+    if not capture.ready.wait(timeout):
+        raise TimeoutError("microphone calibration did not finish")
+    if capture.error is not None:
+        raise capture.error
+
+# Warm up while the start/info screens show, so the first turn is as fast as later ones
+prewarmer = Prewarmer(on_change=frame_scheduler.wake)
+
+def start_prewarm():
+    """Started after the first interactive frame so none of it delays startup."""
+    prewarmer.run("api", lambda: llm_worker.submit(warmup_llm()))
+    greetings = scene.greetings()
+    if greetings:
+        prewarmer.run("greeting", lambda: tts_pipeline.prefetch(greetings[0][1]))
+    prewarmer.run("memory", lambda: llm_worker.submit(scene.warmup()))
+    if voice_mode:
+        # Started here on the main thread; only the wait goes to the "io" pool so the "stt" worker stays free
+        prewarmer.run("voice", lambda: scheduler.submit("io", wait_for_calibration, ensure_voice_capture()))
+API_KEEPALIVE_S = 90  # re-warm before the pooled connection idles out (120s)
+API_KEEPALIVE_IDLE_S = 300  # nobody touching the start/info screen for this long: let it idle out
+last_input_at = time.perf_counter()
+
+def get_llm_response_async(message, targets, request_id=None):
+    """Ask every targeted NPC at once on the LLM worker; results are tagged with `request_id` so stale ones can be dropped."""
+    submitted = time.perf_counter()
+
+    async def _scene_turn():
+        metrics.observe("llm.queue_wait_ms", (time.perf_counter() - submitted) * 1000)
+        async for npc_id, kind, payload in scene.turn(message, targets):
+            if kind == "error":
+                payload = f"Error getting response: {payload}"
+            scheduler.post("llm", (request_id, npc_id, kind, payload))
     
-    thread = threading.Thread(target=_get_response)
-    thread.daemon = True
-    thread.start()
+    return llm_worker.submit(_scene_turn())
+
+# The request the NPCs are currently answering; anything tagged with an older id is ignored
+llm_request = None
+llm_request_id = 0
+
+def cancel_llm_request():
+    """Drop the in-flight request (if any); partly streamed replies stay as they are."""
+    global llm_request, llm_request_id, waiting_for_llm, pending_npcs, streaming_messages
+    if not waiting_for_llm:
+        return False
+    if llm_request is not None:
+        llm_request.cancel()
+    llm_request = None
+    llm_request_id += 1
+    waiting_for_llm = False
+    pending_npcs = []
+    streaming_messages = {}
+    return True
 
 def handle_chat_input(player_message):
-    global full_history, scroll_offset, waiting_for_llm
+    global full_history, waiting_for_llm, llm_request, llm_request_id, pending_npcs
     
     if not player_message.strip():
         return
         
+    # A new message replaces whatever the NPCs were still working on
+    cancel_llm_request()
+    finish_typewriter()
+    # The player talking over an NPC stops the current line
+    tts_pipeline.cancel_all()
     full_history.append({"role": "user", "content": player_message})
     update_chat_display()
     
-    llm_history = full_history.copy()
+    # Scripted café moments are answered inside the NPC's session, without a model round trip
+    pending_npcs = scene.route(player_message)
     waiting_for_llm = True
-    get_llm_response_async(player_message, llm_history)
+    llm_request_id += 1
+    llm_request = get_llm_response_async(player_message, pending_npcs, llm_request_id)
 
 def draw_button(rect, text, color, hover_color):
     mouse_pos = pygame.mouse.get_pos()
@@ -226,290 +304,541 @@ def draw_button(rect, text, color, hover_color):
     pygame.draw.rect(screen, current_color, rect, border_radius=10)
     pygame.draw.rect(screen, BLACK, rect, 2, border_radius=10)
     
-    text_surface = font.render(text, True, BLACK)
+    text_surface = renderer.cached(("label", text), lambda: font.render(text, True, BLACK))
     text_rect = text_surface.get_rect(center=rect.center)
     screen.blit(text_surface, text_rect)
     return rect.collidepoint(mouse_pos)
 
-def draw_microphone_icon(x, y, active=False):
+def draw_microphone_icon(x, y, active=False, surface=None):
+    surface = surface or screen
     color = RED if active else GRAY
     # All coordinates are relative to x,y now
     mic_body = pygame.Rect(x + 8, y + 5, 8, 15)
-    pygame.draw.rect(screen, color, mic_body, border_radius=4)
-    pygame.draw.rect(screen, BLACK, mic_body, 1, border_radius=4)
-    pygame.draw.line(screen, color, (x + 12, y + 20), (x + 12, y + 25), 2)
-    pygame.draw.line(screen, color, (x + 8, y + 25), (x + 16, y + 25), 2)
+    pygame.draw.rect(surface, color, mic_body, border_radius=4)
+    pygame.draw.rect(surface, BLACK, mic_body, 1, border_radius=4)
+    pygame.draw.line(surface, color, (x + 12, y + 20), (x + 12, y + 25), 2)
+    pygame.draw.line(surface, color, (x + 8, y + 25), (x + 16, y + 25), 2)
     if active:
         for i in range(1, 4):
             wave_radius = 5 + i * 3
-            pygame.draw.circle(screen, RED, (x + 12, y + 12), wave_radius, 1)
+            pygame.draw.circle(surface, RED, (x + 12, y + 12), wave_radius, 1)
 
-def draw_keyboard_icon(x, y):
+def draw_keyboard_icon(x, y, surface=None):
+    surface = surface or screen
     keyboard_rect = pygame.Rect(x + 2, y + 8, 20, 12)
-    pygame.draw.rect(screen, GRAY, keyboard_rect, border_radius=2)
-    pygame.draw.rect(screen, BLACK, keyboard_rect, 1, border_radius=2)
+    pygame.draw.rect(surface, GRAY, keyboard_rect, border_radius=2)
+    pygame.draw.rect(surface, BLACK, keyboard_rect, 1, border_radius=2)
     for row in range(2):
         for col in range(4):
             key_x = x + 4 + col * 4
             key_y = y + 10 + row * 4
             key_rect = pygame.Rect(key_x, key_y, 3, 3)
-            pygame.draw.rect(screen, WHITE, key_rect)
-            pygame.draw.rect(screen, BLACK, key_rect, 1)
+            pygame.draw.rect(surface, WHITE, key_rect)
+            pygame.draw.rect(surface, BLACK, key_rect, 1)
+
+def _mode_icon(voice, active):
+    # Icons are drawn at their 24x30 design size once, then scaled with the layout
+    icon = pygame.Surface((24, 30), pygame.SRCALPHA)
+    if voice:
+        draw_microphone_icon(0, 0, active, icon)
+    else:
+        draw_keyboard_icon(0, 0, icon)
+    size = (round(24 * layout.scale), round(30 * layout.scale))
+    return icon if layout.scale == 1 else pygame.transform.smoothscale(icon, size)
 
 def draw_listening_animation(x, y):
-    global mic_animation_frames
-    
     if not listening:
         return
     
-    mic_animation_frames += 1
-    
     pulse_size = int(10 + 5 * abs(math.sin(mic_animation_frames * 0.1)))
-    pulse_surface = pygame.Surface((pulse_size * 2, pulse_size * 2), pygame.SRCALPHA)
-    pygame.draw.circle(pulse_surface, (255, 0, 0, 100), (pulse_size, pulse_size), pulse_size)
+    pulse_surface = renderer.cached(("pulse", pulse_size), lambda: _pulse_surface(pulse_size))
     screen.blit(pulse_surface, (x - pulse_size + 12, y - pulse_size + 12))
     
-    listening_text = font.render("LISTENING...", True, RED)
+    listening_text = renderer.cached(("text", "LISTENING..."), lambda: font.render("LISTENING...", True, RED))
     screen.blit(listening_text, (x - 50, y + 35))
 
-# Main game loop
-running = True
-while running:
-    dt = clock.tick(60) / 1000.0  # Increased to 60 FPS for smoother scrolling
-
-    # Check for voice input
-    if not voice_input_queue.empty():
-        status, message = voice_input_queue.get()
-        if status == "success":
-            handle_chat_input(message)
-        else:
-            full_history.append({"role": "system", "content": message})
-            update_chat_display()
+def _pulse_surface(pulse_size):
+    pulse_surface = pygame.Surface((pulse_size * 2, pulse_size * 2), pygame.SRCALPHA)
+    pygame.draw.circle(pulse_surface, (255, 0, 0, 100), (pulse_size, pulse_size), pulse_size)
+    return pulse_surface
+
+def _panel(size):
+    panel = pygame.Surface(size, pygame.SRCALPHA)
+    panel.fill(SEMI_TRANSPARENT)
+    return panel
+
+INFO_LINES = [
+    "THE SENTIENT SIP", "", "A conversational AI experience",
+    "where you chat with Rita,", "your digital waitress at",
+    "a futuristic café.", "", "Controls:",
+    "TEXT MODE:", "- Type and press ENTER to chat",
+    "VOICE MODE:", "- Press SPACE to start speaking",
+    "- Mouse wheel or Up/Down arrows to scroll", "",
+    "Created with Mistral AI and Pygame"
+]
+
+def build_start_layer():
+    layer = renderer.new_layer()
+    layer.fill(BLACK)
+    layer.blit(bg, (0, 0))
+    title_surface = title_font.render("The Sentient Sip", True, WHITE)
+    title_shadow = title_font.render("The Sentient Sip", True, BLACK)
+    offset = layout.title_shadow
+    layer.blit(title_shadow, (screen_width//2 - title_surface.get_width()//2 + offset, layout.title_y + offset))
+    layer.blit(title_surface, (screen_width//2 - title_surface.get_width()//2, layout.title_y))
+    layer.blit(assets.get("rita", layout.start_rita_rect.size), layout.start_rita_rect.topleft)
+    return layer
+
+def build_info_layer():
+    layer = renderer.new_layer()
+    layer.fill((50, 50, 70))
+    y_offset = layout.info_top
+    for line in INFO_LINES:
+        text_surface = font.render(line, True, WHITE)
+        layer.blit(text_surface, (screen_width//2 - text_surface.get_width()//2, y_offset))
+        y_offset += layout.info_spacing
+    return layer
+
+def build_chat_layer(rita_hovered):
+    layer = renderer.new_layer()
+    layer.fill(BLACK)
+    layer.blit(bg, (0, 0))
+    
+    # Draw Rita
+    if rita_hovered:
+        highlight = pygame.Surface((rita_rect.width+10, rita_rect.height+10), pygame.SRCALPHA)
+        highlight.fill((255, 255, 255, 50))
+        layer.blit(highlight, (rita_rect.x-5, rita_rect.y-5))
+    # The full-size Rita is only scaled once the chat is first shown
+    layer.blit(assets.get("rita", rita_rect.size), (rita_rect.x, rita_rect.y))
+    
+    # Text box and input box panels
+    layer.blit(_panel(textbox_rect.size), textbox_rect.topleft)
+    pygame.draw.rect(layer, BLACK, textbox_rect, 2)
+    layer.blit(_panel(input_rect.size), input_rect.topleft)
+    pygame.draw.rect(layer, BLACK, input_rect, 2)
+    return layer
+
+def draw_start_screen():
+    renderer.begin("start", build_start_layer)
+    mouse_pos = pygame.mouse.get_pos()
+    for rect, label in ((start_button, "START"), (info_button, "INFO")):
+        renderer.region(label, rect, rect.collidepoint(mouse_pos),
+                        lambda rect=rect, label=label: draw_button(rect, label, PINK, WHITE))
+    draw_readiness()
+
+def draw_readiness():
+    readiness = prewarmer.summary()
+    y = info_button.bottom + round(20 * layout.scale)
+    renderer.region("readiness", (0, y, screen_width, LINE_HEIGHT), readiness,
+                    lambda: screen.blit(font.render(readiness, True, WHITE),
+                                        (screen_width//2 - font.size(readiness)[0]//2, y)))
+
+def draw_info_screen():
+    renderer.begin("info", build_info_layer)
+    renderer.region("BACK", back_button, back_button.collidepoint(pygame.mouse.get_pos()),
+                    lambda: draw_button(back_button, "BACK", PINK, WHITE))
+
+def draw_voice_button(hovered, pulse_strength):
+    # Voice toggle button with centered content and hover effects
+    voice_color = GREEN if voice_mode else PINK
+    
+    # Add hover effect
+    if hovered:
+        voice_color = [min(c + 30, 255) for c in voice_color]  # Lighten color on hover
+    
+    # Add drop shadow
+    shadow_surface = renderer.cached("voice_shadow", _voice_shadow)
+    screen.blit(shadow_surface, (voice_button.x + 2, voice_button.y + 2))
+    
+    # Draw button
+    pygame.draw.rect(screen, voice_color, voice_button, border_radius=20)
+    pygame.draw.rect(screen, BLACK, voice_button, 2, border_radius=20)
+
+    # Calculate centered positions
+    mode_text = "VOICE" if voice_mode else "TEXT"
+    text_surface = renderer.cached(("label", mode_text), lambda: font.render(mode_text, True, BLACK))
+    icon = renderer.cached(("icon", voice_mode, listening), lambda: _mode_icon(voice_mode, listening))
+    icon_width = round(20 * layout.scale)  # Same width for both icons
+    spacing = round(10 * layout.scale)
+
+    # Center the combined icon+text content
+    total_content_width = icon_width + spacing + text_surface.get_width()
+    start_x = voice_button.x + (voice_button.width - total_content_width) // 2
+    icon_y = voice_button.y + (voice_button.height - round(20 * layout.scale)) // 2  # Center vertically
+    text_y = voice_button.y + (voice_button.height - text_surface.get_height()) // 2
+
+    # Draw icon
+    screen.blit(icon, (start_x, icon_y))
+
+    # Draw text
+    screen.blit(text_surface, (start_x + icon_width + spacing, text_y))
+
+    # Add clickable indicator (pulsing border when hovered)
+    if hovered:
+        pulse_color = (min(255, 255 + pulse_strength), 
+                    min(255, 255 + pulse_strength), 
+                    min(255, 255 + pulse_strength))
+        pygame.draw.rect(screen, pulse_color, 
+                        (voice_button.x - 4, voice_button.y - 4, 
+                        voice_button.width + 8, voice_button.height + 8), 
+                        border_radius=24, width=3)
+
+def _voice_shadow():
+    shadow_surface = pygame.Surface((voice_button.width, voice_button.height), pygame.SRCALPHA)
+    pygame.draw.rect(shadow_surface, (*BLACK, 30), (2, 2, voice_button.width, voice_button.height), border_radius=20)
+    return shadow_surface
+
+def draw_input_line(cursor_visible):
+    # Input text with centered vertical alignment
+    input_surface = font.render(f"> {input_text}", True, BLACK)
+    screen.blit(input_surface, (input_rect.x + 10, input_rect.y + (input_rect.height - input_surface.get_height()) // 2 + 2))
+
+    # Cursor with proper alignment
+    if cursor_visible:
+        cursor_x = input_rect.x + 10 + input_surface.get_width()
+        cursor_height = font.get_height()
+        pygame.draw.rect(screen, BLACK, (cursor_x, input_rect.y + (input_rect.height - cursor_height) // 2, 2, cursor_height))
+
+def draw_chat_lines():
+    # Draw chat lines with scrolling
+    chat_view.draw(screen, textbox_rect)
+
+    # Scroll bar
+    scrollbar = chat_view.scrollbar_rect(textbox_rect)
+    if scrollbar:
+        pygame.draw.rect(screen, GRAY, scrollbar)
+
+def draw_status(status, status_y):
+    if status:
+        status_surface = renderer.cached(("text", status), lambda: font.render(status, True, GRAY))
+        screen.blit(status_surface, (textbox_rect.x + 20, status_y))
+
+VOICE_METER_BARS = (0.55, 1.0, 0.75, 0.4)  # relative bar heights, loudest in the middle
+
+def draw_voice_meter(level):
+    """Equalizer bars beside Rita that follow the loudness of the audio playing now."""
+    rect = layout.voice_meter_rect
+    bar_w = max(2, rect.width // (2 * len(VOICE_METER_BARS)))
+    for i, weight in enumerate(VOICE_METER_BARS):
+        height = max(bar_w, round(rect.height * weight * level))
+        bar = pygame.Rect(rect.x + i * 2 * bar_w, rect.centery - height // 2, bar_w, height)
+        pygame.draw.rect(screen, WHITE, bar, border_radius=bar_w // 2)
+
+def draw_chat_screen():
+    global mic_animation_frames
+    mouse_pos = pygame.mouse.get_pos()
+    rita_hovered = rita_rect.collidepoint(mouse_pos)
+    renderer.begin(("chat", rita_hovered), lambda: build_chat_layer(rita_hovered))
+
+    hovered = voice_button.collidepoint(mouse_pos)
+    pulse_strength = abs(int(255 * (pygame.time.get_ticks() % 1000) / 500 - 1)) if hovered else 0
+    renderer.region("voice_button", voice_button.inflate(12, 12), (voice_mode, listening, hovered, pulse_strength),
+                    lambda: draw_voice_button(hovered, pulse_strength))
+
+    if voice_mode and listening:
+        mic_animation_frames += 1
+    show_listening = voice_mode and listening
+    listen_x, listen_y = layout.listening_pos
+    renderer.region("listening", (listen_x - 50, listen_y - 15, 130, 80), (show_listening, mic_animation_frames),
+                    lambda: draw_listening_animation(listen_x, listen_y) if show_listening else None)
+
+    # Quantized so a steady level does not redraw every frame
+    level = round(audio_engine.level() * 8) / 8 if audio_engine.speaking else None
+    renderer.region("voice_meter", layout.voice_meter_rect, level,
+                    lambda: draw_voice_meter(level) if level is not None else None)
+
+    renderer.region("chat", textbox_rect.inflate(-4, -4),
+                    (chat_view.revision, chat_view.scroll_offset, chat_view.reveal_message is not None and chat_view.reveal),
+                    draw_chat_lines)
+
+    cursor_visible = pygame.time.get_ticks() % 1000 < 500
+    renderer.region("input", input_rect.inflate(-4, -4), (input_text, cursor_visible),
+                    lambda: draw_input_line(cursor_visible))
+
+    # Status indicators
+    status_y = textbox_rect.y - 2 * LINE_HEIGHT
+    status = None
+    thinking = [scene.personas[npc_id].name for npc_id in pending_npcs if npc_id not in streaming_messages]
+    if thinking:
+        status = " and ".join(thinking) + (" is thinking..." if len(thinking) == 1 else " are thinking...")
+    elif audio_engine.speaking:
+        status = "Speaking..." if len(scene.npcs) > 1 else "Rita is speaking..."
+    renderer.region("status", (textbox_rect.x + 20, status_y, TEXTBOX_WIDTH - 40, LINE_HEIGHT), status,
+                    lambda: draw_status(status, status_y))
+    
+    # Hints
+    hint_text = "Press SPACE to talk" if voice_mode else "Type and press ENTER"
+    if waiting_for_llm:
+        hint_text += " | ESC to cancel"
+    if len(full_history) > 1:
+        hint_text += " | Mouse wheel or Up/Down to scroll"
+    hint_y = textbox_rect.y - LINE_HEIGHT
+    renderer.region("hint", (textbox_rect.x + 20, hint_y, TEXTBOX_WIDTH - 40, LINE_HEIGHT), hint_text,
+                    lambda: screen.blit(font.render(hint_text, True, GRAY), (textbox_rect.x + 20, hint_y)))
+
+# F3 toggles the performance overlay (and turns metrics recording on)
+show_metrics = False
+METRICS_REFRESH_MS = 500
+
+def _ms(name, q):
+    value = metrics.percentile(name, q)
+    return "-" if value is None else f"{value:.0f}" if value >= 100 else f"{value:.1f}"
+
+def metrics_lines():
+    fps = frame_scheduler.clock.get_fps()
+    return [
+        f"FPS {fps:4.0f}  frame p50 {_ms('frame.total_ms', 50)} p95 {_ms('frame.total_ms', 95)} ms",
+        f"  events {_ms('frame.events_ms', 95)}  results {_ms('frame.results_ms', 95)}"
+        f"  draw {_ms('frame.draw_ms', 95)}  present {_ms('frame.present_ms', 95)} ms (p95)",
+        f"LLM queue {_ms('llm.queue_wait_ms', 95)}  first token {_ms('llm.first_token_ms', 50)}/{_ms('llm.first_token_ms', 95)}"
+        f"  total {_ms('llm.total_ms', 50)}/{_ms('llm.total_ms', 95)} ms (p50/p95)",
+        f"  tokens prompt {_ms('llm.prompt_tokens', 50)}  completion {_ms('llm.completion_tokens', 50)} (p50)",
+        f"TTS synth {_ms('tts.synthesis_ms', 50)}/{_ms('tts.synthesis_ms', 95)}"
+        f"  playback start {_ms('tts.playback_start_ms', 50)}/{_ms('tts.playback_start_ms', 95)} ms",
+        f"STT calibration {_ms('stt.calibration_ms', 50)}  capture {_ms('stt.capture_ms', 50)}"
+        f"  recognition {_ms('stt.recognition_ms', 50)}/{_ms('stt.recognition_ms', 95)} ms",
+        "Queued  " + "  ".join(f"{pool} {count}" for pool, count in scheduler.pending().items()),
+    ]
+
+def draw_metrics_overlay():
+    if not show_metrics:
+        return
+    lines = metrics_lines()
+    line_height = overlay_font.get_linesize()
+    rect = pygame.Rect(5, 5, max(overlay_font.size(line)[0] for line in lines) + 10, len(lines) * line_height + 10)
+
+    def draw():
+        backdrop = pygame.Surface(rect.size, pygame.SRCALPHA)
+        backdrop.fill((0, 0, 0, 170))
+        screen.blit(backdrop, rect.topleft)
+        for i, line in enumerate(lines):
+            screen.blit(overlay_font.render(line, True, WHITE), (rect.x + 5, rect.y + 5 + i * line_height))
+
+    renderer.region("metrics", rect, (pygame.time.get_ticks() // METRICS_REFRESH_MS, tuple(lines)), draw)
+
+def animation_state():
+    """(animating, next deadline tick) for the frame scheduler."""
+    if game_state != STATE_CHAT:
+        if show_metrics:
+            now = pygame.time.get_ticks()
+            return False, now - now % METRICS_REFRESH_MS + METRICS_REFRESH_MS
+        return False, None
+    if (voice_mode and listening) or is_typing or audio_engine.speaking:
+        return True, None
+    if voice_button.collidepoint(pygame.mouse.get_pos()):
+        return True, None  # pulsing hover border
+    # Otherwise only the cursor blink changes on its own, every 500ms
+    now = pygame.time.get_ticks()
+    return False, now - now % 500 + 500
+
+def process_results():
+    """Apply everything the workers finished since the last frame (voice input, NPC reply chunks and replies)."""
+    global waiting_for_llm, llm_request
+    for kind, item in scheduler.drain():
+        if kind == "voice":
+            status, message = item
+            if status == "success":
+                handle_chat_input(message)
+            else:
+                full_history.append({"role": "system", "content": message})
+                update_chat_display()
+            continue
 
-    # Check for LLM response
-    if not llm_response_queue.empty():
-        status, response = llm_response_queue.get()
-        waiting_for_llm = False
+        request_id, npc_id, status, response = item
+        if request_id != llm_request_id:
+            continue  # a cancelled or replaced request
+        
+        message = streaming_messages.get(npc_id)
+        if status == "chunk":
+            if not STREAM_RESPONSES:
+                continue  # shown all at once (typewriter) when the NPC is done
+            if message is None:
+                message = streaming_messages[npc_id] = {"role": "assistant", "speaker": npc_id, "content": ""}
+                full_history.append(message)
+            message["content"] += response
+            update_chat_display((message,))
+            continue
         
-        if status == "success":
-            current_typing_text = response
-            typing_progress = 0
-            is_typing = True
+        if npc_id in pending_npcs:
+            pending_npcs.remove(npc_id)
+        waiting_for_llm = bool(pending_npcs)
+        if not waiting_for_llm:
+            llm_request = None
+        streaming_messages.pop(npc_id, None)
+        if status == "done":
+            response, _, scripted = response  # trust is kept per NPC in the scene
             
             if voice_mode:
                 speak_async(response)
             
-            full_history.append({"role": "assistant", "content": response})
-            update_chat_display()
+            if message is None:
+                full_history.append({"role": "assistant", "speaker": npc_id, "content": response})
+                update_chat_display()
+                start_typewriter(full_history[-1])
+            else:
+                message["content"] = response
+                update_chat_display((message,))
+                if scripted:
+                    start_typewriter(message)
         else:
             error_msg = "Sorry, I'm having trouble responding right now."
-            full_history.append({"role": "assistant", "content": error_msg})
+            if message is not None:
+                message["content"] += " ... " + error_msg
+                update_chat_display((message,))
+            else:
+                full_history.append({"role": "assistant", "speaker": npc_id, "content": error_msg})
             update_chat_display()
-        
-        is_typing = False
 
-    # Event handling
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-            
-        elif event.type == pygame.MOUSEBUTTONDOWN:
-            if game_state == STATE_START:
-                if start_button.collidepoint(event.pos):
-                    game_state = STATE_CHAT
-                    initial_message = "Welcome to The Sentient Sip! How can I help you today?"
-                    full_history = [{"role": "assistant", "content": initial_message}]
-                    update_chat_display()
-                elif info_button.collidepoint(event.pos):
-                    game_state = STATE_INFO
-                    
-            elif game_state == STATE_INFO and back_button.collidepoint(event.pos):
-                game_state = STATE_START
-                
-            elif game_state == STATE_CHAT and voice_button.collidepoint(event.pos):
-                voice_mode = not voice_mode
-                
-        elif event.type == pygame.MOUSEWHEEL:
-            if game_state == STATE_CHAT:
-                scroll_offset = max(0, scroll_offset - event.y * SCROLL_SPEED * LINE_HEIGHT)
-                
-        elif event.type == pygame.KEYDOWN and game_state == STATE_CHAT:
-            if voice_mode and event.key == pygame.K_SPACE and not listening:
-                listen_async()
-            elif not voice_mode:
-                if event.key == pygame.K_RETURN and not waiting_for_llm:
-                    handle_chat_input(input_text)
-                    input_text = ""
-                elif event.key == pygame.K_BACKSPACE:
-                    input_text = input_text[:-1]
-                elif event.key == pygame.K_UP:
-                    scroll_offset = max(0, scroll_offset - SCROLL_SPEED * LINE_HEIGHT)
-                elif event.key == pygame.K_DOWN:
-                    max_offset = max(0, len(chat_lines) * LINE_HEIGHT - TEXTBOX_HEIGHT + 100)
-                    scroll_offset = min(max_offset, scroll_offset + SCROLL_SPEED * LINE_HEIGHT)
-                elif event.unicode and event.unicode.isprintable():
-                    input_text += event.unicode
-
-    # Update typing animation
-    if game_state == STATE_CHAT and is_typing and typing_progress < len(current_typing_text):
-        typing_progress += 30 * dt
-        update_chat_display()
-
-    # Drawing
-    screen.fill(BLACK)
-    
-    if game_state == STATE_START:
-        screen.blit(bg, (0, 0))
-        title_surface = title_font.render("The Sentient Sip", True, WHITE)
-        title_shadow = title_font.render("The Sentient Sip", True, BLACK)
-        screen.blit(title_shadow, (screen_width//2 - title_surface.get_width()//2 + 5, screen_height//4 + 5))
-        screen.blit(title_surface, (screen_width//2 - title_surface.get_width()//2, screen_height//4))
-        
-        start_hover = draw_button(start_button, "START", PINK, WHITE)
-        info_hover = draw_button(info_button, "INFO", PINK, WHITE)
-        screen.blit(pygame.transform.scale(rita, (100, 200)), (screen_width - 150, screen_height - 250))
+def handle_event(event):
+    global running, game_state, full_history, voice_mode, show_metrics, input_text, last_input_at
+    if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN):
+        last_input_at = time.perf_counter()
+        if game_state != STATE_CHAT:
+            prewarmer.refresh("api", API_KEEPALIVE_S)  # back after a pause: re-warm before the first turn
+    if event.type == pygame.QUIT:
+        running = False
         
-    elif game_state == STATE_INFO:
-        screen.fill((50, 50, 70))
-        draw_button(back_button, "BACK", PINK, WHITE)
-        
-        info_lines = [
-            "THE SENTIENT SIP", "", "A conversational AI experience",
-            "where you chat with Rita,", "your digital waitress at",
-            "a futuristic café.", "", "Controls:",
-            "TEXT MODE:", "- Type and press ENTER to chat",
-            "VOICE MODE:", "- Press SPACE to start speaking",
-            "- Mouse wheel or Up/Down arrows to scroll", "",
-            "Created with Mistral AI and Pygame"
-        ]
-        
-        y_offset = 120
-        for line in info_lines:
-            text_surface = font.render(line, True, WHITE)
-            screen.blit(text_surface, (screen_width//2 - text_surface.get_width()//2, y_offset))
-            y_offset += 35
-        
-    elif game_state == STATE_CHAT:
-        screen.blit(bg, (0, 0))
-        
-        # Draw Rita
-        mouse_pos = pygame.mouse.get_pos()
-        if rita_rect.collidepoint(mouse_pos):
-            highlight = pygame.Surface((rita_rect.width+10, rita_rect.height+10), pygame.SRCALPHA)
-            highlight.fill((255, 255, 255, 50))
-            screen.blit(highlight, (rita_rect.x-5, rita_rect.y-5))
-        screen.blit(rita, (rita_rect.x, rita_rect.y))
-
-        # Voice toggle button with centered content and hover effects
-        voice_color = GREEN if voice_mode else PINK
-        hovered = voice_button.collidepoint(pygame.mouse.get_pos())
+    elif event.type in (pygame.VIDEORESIZE, pygame.WINDOWSIZECHANGED):
+        if pygame.display.get_surface().get_size() != (screen_width, screen_height):
+            apply_layout(*pygame.display.get_surface().get_size())
         
-        # Add hover effect
-        if hovered:
-            voice_color = [min(c + 30, 255) for c in voice_color]  # Lighten color on hover
-        
-        # Add drop shadow
-        shadow_surface = pygame.Surface((voice_button.width, voice_button.height), pygame.SRCALPHA)
-        pygame.draw.rect(shadow_surface, (*BLACK, 30), (2, 2, voice_button.width, voice_button.height), border_radius=20)
-        screen.blit(shadow_surface, (voice_button.x + 2, voice_button.y + 2))
-        
-        # Draw button
-        pygame.draw.rect(screen, voice_color, voice_button, border_radius=20)
-        pygame.draw.rect(screen, BLACK, voice_button, 2, border_radius=20)
-
-        # Calculate centered positions
-        mode_text = "VOICE" if voice_mode else "TEXT"
-        text_surface = font.render(mode_text, True, BLACK)
-        icon_width = 20  # Fixed width for both icons
-
-        # Center the combined icon+text content
-        total_content_width = icon_width + 10 + text_surface.get_width()  # 10 = spacing
-        start_x = voice_button.x + (voice_button.width - total_content_width) // 2
-        icon_y = voice_button.y + (voice_button.height - 20) // 2  # Center vertically
-        text_y = voice_button.y + (voice_button.height - text_surface.get_height()) // 2
-
-        # Draw icon
-        if voice_mode:
-            draw_microphone_icon(start_x, icon_y, listening)
-        else:
-            draw_keyboard_icon(start_x, icon_y)
-
-        # Draw text
-        screen.blit(text_surface, (start_x + icon_width + 10, text_y))  # 10 = spacing
-
-        # Add clickable indicator (pulsing border when hovered)
-        if hovered:
-            pulse_strength = abs(int(255 * (pygame.time.get_ticks() % 1000) / 500 - 1))
-            pulse_color = (min(255, 255 + pulse_strength), 
-                        min(255, 255 + pulse_strength), 
-                        min(255, 255 + pulse_strength))
-            pygame.draw.rect(screen, pulse_color, 
-                            (voice_button.x - 4, voice_button.y - 4, 
-                            voice_button.width + 8, voice_button.height + 8), 
-                            border_radius=24, width=3)
-
-        if voice_mode:
-            draw_listening_animation(screen_width - 270, 55)
-
-        # Text box
-        textbox_rect = pygame.Rect(25, screen_height - TEXTBOX_HEIGHT - 50, TEXTBOX_WIDTH, TEXTBOX_HEIGHT)
-        textbox_surface = pygame.Surface((textbox_rect.width, textbox_rect.height), pygame.SRCALPHA)
-        textbox_surface.fill(SEMI_TRANSPARENT)
-        screen.blit(textbox_surface, (textbox_rect.x, textbox_rect.y))
-        pygame.draw.rect(screen, BLACK, textbox_rect, 2)
-
-        # Draw chat lines with scrolling
-        screen.set_clip(textbox_rect)
-        y_pos = textbox_rect.y + 10 - scroll_offset
-        for surface, y_offset in chat_lines:
-            if (y_pos + y_offset + surface.get_height() > textbox_rect.y and 
-                y_pos + y_offset < textbox_rect.y + textbox_rect.height):
-                screen.blit(surface, (textbox_rect.x + 20, y_pos + y_offset))
-        screen.set_clip(None)
-
-        # Scroll bar
-        if len(chat_lines) * LINE_HEIGHT > TEXTBOX_HEIGHT:
-            total_content_height = len(chat_lines) * LINE_HEIGHT
-            visible_ratio = TEXTBOX_HEIGHT / total_content_height
-            scrollbar_height = max(30, TEXTBOX_HEIGHT * visible_ratio)  # Minimum height of 30px
-            scrollbar_pos = (scroll_offset / total_content_height) * TEXTBOX_HEIGHT
+    elif event.type == pygame.MOUSEBUTTONDOWN:
+        if game_state == STATE_START:
+            if start_button.collidepoint(event.pos):
+                game_state = STATE_CHAT
+                full_history = [{"role": "assistant", "speaker": npc_id, "content": line} for npc_id, line in scene.greetings()]
+                chat_view.set_history(full_history)
+                update_chat_display()
+                if voice_mode:
+                    for _, line in scene.greetings():
+                        speak_async(line)
+            elif info_button.collidepoint(event.pos):
+                game_state = STATE_INFO
+                
+        elif game_state == STATE_INFO and back_button.collidepoint(event.pos):
+            game_state = STATE_START
             
-            pygame.draw.rect(screen, GRAY, (
-                textbox_rect.right - 10,
-                textbox_rect.y + scrollbar_pos,
-                8,
-                scrollbar_height
-            ))
-
-        # Input box
-        input_rect = pygame.Rect(textbox_rect.x + 10, textbox_rect.y + textbox_rect.height + 10, textbox_rect.width - 20, 35)
-        input_surface = pygame.Surface((input_rect.width, input_rect.height), pygame.SRCALPHA)
-        input_surface.fill(SEMI_TRANSPARENT)
-        screen.blit(input_surface, (input_rect.x, input_rect.y))
-        pygame.draw.rect(screen, BLACK, input_rect, 2)
-        
-        # Input text with centered vertical alignment
-        input_surface = font.render(f"> {input_text}", True, BLACK)
-        screen.blit(input_surface, (input_rect.x + 10, input_rect.y + (input_rect.height - input_surface.get_height()) // 2 + 2))
-
-        # Cursor with proper alignment
-        if pygame.time.get_ticks() % 1000 < 500:
-            cursor_x = input_rect.x + 10 + font.size(f"> {input_text}")[0]
-            cursor_height = font.get_height()
-            pygame.draw.rect(screen, BLACK, (cursor_x, input_rect.y + (input_rect.height - cursor_height) // 2, 2, cursor_height))
-
-        # Status indicators
-        status_y = textbox_rect.y - 60
-        if waiting_for_llm:
-            status_surface = font.render("Rita is thinking...", True, GRAY)
-            screen.blit(status_surface, (textbox_rect.x + 20, status_y))
-        
-        # Hints
-        hint_text = "Press SPACE to talk" if voice_mode else "Type and press ENTER"
-        if len(full_history) > 1:
-            hint_text += " | Mouse wheel or Up/Down to scroll"
-        screen.blit(font.render(hint_text, True, GRAY), (textbox_rect.x + 20, textbox_rect.y - 30))
+        elif game_state == STATE_CHAT and voice_button.collidepoint(event.pos):
+            voice_mode = not voice_mode
+            if voice_mode:
+                ensure_voice_capture()  # start calibrating before the first SPACE
+            elif voice_capture is not None:
+                voice_capture.disarm()
+            
+    elif event.type == pygame.MOUSEWHEEL:
+        if game_state == STATE_CHAT:
+            chat_view.scroll_by(-event.y * SCROLL_SPEED * LINE_HEIGHT)
+            
+    elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+        show_metrics = not show_metrics
+        metrics.enabled = metrics.enabled or show_metrics
+        renderer.invalidate()  # repaint what the overlay covered
+
+    elif event.type == pygame.KEYDOWN and game_state == STATE_CHAT:
+        if event.key == pygame.K_ESCAPE:
+            if cancel_llm_request():
+                full_history.append({"role": "system", "content": "[Request cancelled]"})
+                update_chat_display()
+        elif voice_mode and event.key == pygame.K_SPACE and not listening:
+            listen_async()
+        elif not voice_mode:
+            if event.key == pygame.K_RETURN:
+                handle_chat_input(input_text)
+                input_text = ""
+            elif event.key == pygame.K_BACKSPACE:
+                input_text = input_text[:-1]
+            elif event.key == pygame.K_UP:
+                chat_view.scroll_by(-SCROLL_SPEED * LINE_HEIGHT)
+            elif event.key == pygame.K_DOWN:
+                chat_view.scroll_by(SCROLL_SPEED * LINE_HEIGHT)
+            elif event.unicode and event.unicode.isprintable():
+                input_text += event.unicode
+
+def update(dt):
+    """Advance animations and background warm-up by `dt` seconds."""
+    global typing_progress, prewarm_reported
+    if game_state == STATE_CHAT and is_typing:
+        typing_progress += TYPING_SPEED * dt
+        if typing_progress >= len(current_typing_text):
+            finish_typewriter()
+        else:
+            chat_view.reveal = int(typing_progress)
 
-    pygame.display.flip()
+    if game_state != STATE_CHAT and time.perf_counter() - last_input_at < API_KEEPALIVE_IDLE_S:
+        prewarmer.refresh("api", API_KEEPALIVE_S)
+    if prewarmer.steps and prewarmer.ready and not prewarm_reported:
+        print(prewarmer.report())
+        prewarm_reported = True
 
-pygame.quit()
\ No newline at end of file
+def draw_frame():
+    """Draw the current game state into the renderer's back buffer (no present)."""
+    if game_state == STATE_START:
+        draw_start_screen()
+    elif game_state == STATE_INFO:
+        draw_info_screen()
+    elif game_state == STATE_CHAT:
+        draw_chat_screen()
+    draw_metrics_overlay()
+
+def run_frame(events, dt):
+    """One iteration of the main loop: worker results, input, animation, drawing and present."""
+    global listening, mic_animation_active
+    frame_started = time.perf_counter()
+
+    listening = voice_capture is not None and voice_capture.listening
+    mic_animation_active = listening
+
+    # Worker results: take everything that arrived since the last frame at once
+    process_results()
+    results_done = time.perf_counter()
+
+    for event in events:
+        handle_event(event)
+    events_done = time.perf_counter()
+
+    update(dt)
+
+    draw_started = time.perf_counter()
+    draw_frame()
+    present_started = time.perf_counter()
+    renderer.present()
+
+    if "first_frame" not in startup_times:
+        startup_times["first_frame"] = time.perf_counter() - STARTUP_STARTED
+        metrics.observe("startup.first_frame_ms", startup_times["first_frame"] * 1000)
+        print("Startup: " + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in startup_times.items()))
+        start_prewarm()
+
+    if metrics.enabled:
+        frame_done = time.perf_counter()
+        metrics.observe("frame.results_ms", (results_done - frame_started) * 1000)
+        metrics.observe("frame.events_ms", (events_done - results_done) * 1000)
+        metrics.observe("frame.draw_ms", (present_started - draw_started) * 1000)
+        metrics.observe("frame.present_ms", (frame_done - present_started) * 1000)
+        metrics.observe("frame.total_ms", (frame_done - frame_started) * 1000)
+        metrics.maybe_export()
+
+def shutdown():
+    llm_worker.stop()
+    tts_pipeline.shutdown()
+    if voice_capture is not None:
+        voice_capture.stop()
+    scheduler.shutdown(wait=True)
+    if metrics.enabled:
+        metrics.export()
+    pygame.quit()
+
+running = True
+prewarm_reported = False
+
+def main():
+    # Main game loop
+    while running:
+        animating, deadline = animation_state()
+        events, dt = frame_scheduler.next_frame(animating, deadline)
+        run_frame(events, dt)
+    shutdown()
+
+if __name__ == "__main__":
+    main()
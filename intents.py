@@ -0,0 +1,88 @@
+import os
+import re
+import json
+
+INTENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "intents.json")
+LOCAL_INTENTS = os.getenv("Local_Intents", "1") != "0"
+
+def normalize(text):
+    return " ".join(re.sub(r"[^\w\s',]", " ", text.casefold()).split())
+
+class IntentTable:
+    """Scripted café intents from data/intents.json, compiled once.
+
+    All `patterns` are also folded into one combined regex, so the common case
+    (a message that is not scripted at all) costs a single scan before it goes
+    to the LLM. `requires` (all must match) and `unless` (none may match) are
+    only checked for candidates. Earlier entries in the file win. Entries with
+    a `counter` only count matches (e.g. rudeness); entries with `above` fire
+    once that counter passes the threshold.
+    """
+
+    def __init__(self, path=INTENTS_FILE):
+        with open(path, encoding="utf-8") as f:
+            self.intents = json.load(f)
+        self.compiled = []
+        for intent in self.intents:
+            self.compiled.append((
+                re.compile("|".join(f"(?:{p})" for p in intent["patterns"])) if intent.get("patterns") else None,
+                [re.compile(p) for p in intent.get("requires", [])],
+                [re.compile(p) for p in intent.get("unless", [])],
+            ))
+        patterns = [pattern.pattern for pattern, _, _ in self.compiled if pattern is not None]
+        self.prefilter = re.compile("|".join(patterns)) if patterns else None
+        self.triggers = [intent for intent in self.intents if "above" in intent]
+
+    def candidates(self, text):
+        """Indexes of intents that apply to the (normalized) text, in table order."""
+        if self.prefilter is None or not self.prefilter.search(text):
+            return []
+        words = len(text.split())
+        found = []
+        for index, (pattern, requires, unless) in enumerate(self.compiled):
+            max_words = self.intents[index].get("max_words")
+            if pattern is None or not pattern.search(text) or (max_words and words > max_words):
+                continue
+            if all(p.search(text) for p in requires) and not any(p.search(text) for p in unless):
+                found.append(index)
+        return found
+
+_default_table = None
+
+def default_table():
+    global _default_table
+    if _default_table is None:
+        _default_table = IntentTable()
+    return _default_table
+
+class IntentMatcher:
+    """Per-conversation matcher: answers scripted intents locally and keeps the counters."""
+
+    def __init__(self, table=None):
+        self.table = table or default_table()
+        self.counters = {}
+        self.hits = 0
+
+    def match(self, message):
+        """Return (intent_name, reply) for a scripted intent, or None to ask the LLM."""
+        text = normalize(message)
+        reply = None
+        for index in self.table.candidates(text):
+            intent = self.table.intents[index]
+            if "reply" not in intent:
+                counter = intent["counter"]
+                self.counters[counter] = self.counters.get(counter, 0) + 1
+            elif reply is None:
+                reply = (intent["name"], intent["reply"])
+
+        for trigger in self.table.triggers:
+            counter = trigger["counter"]
+            if self.counters.get(counter, 0) > trigger["above"]:
+                if trigger.get("reset"):
+                    self.counters[counter] = 0
+                reply = (trigger["name"], trigger["reply"])
+                break
+
+        if reply is not None:
+            self.hits += 1
+        return reply
@@ -0,0 +1,77 @@
+import pygame
+
+# The window size the original layout was designed for; everything scales from it
+REFERENCE_WIDTH, REFERENCE_HEIGHT = 1500, 750
+
+class Layout:
+    """Screen geometry for one window size, scaled from the 1500x750 reference."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.scale = s = max(0.5, min(width / REFERENCE_WIDTH, height / REFERENCE_HEIGHT))
+
+        self.font_size = max(12, round(24 * s))
+        self.title_font_size = max(24, round(48 * s))
+        self.line_height = max(15, round(30 * s))
+
+        rita_size = round(700 * s)
+        self.rita_rect = pygame.Rect(width//2 - rita_size//2, height//2 - rita_size//2, rita_size, rita_size)
+        # Beside Rita's face, where the voice meter bars are drawn while she speaks
+        self.voice_meter_rect = pygame.Rect(self.rita_rect.x + round(580 * s), self.rita_rect.y + round(150 * s),
+                                            round(60 * s), round(50 * s))
+        self.start_rita_rect = pygame.Rect(width - round(150 * s), height - round(250 * s), round(100 * s), round(200 * s))
+        self.title_y = height // 4
+        self.title_shadow = max(2, round(5 * s))
+
+        button_w, button_h = round(300 * s), round(80 * s)
+        self.start_button = pygame.Rect(width//2 - button_w//2, height//2, button_w, button_h)
+        self.info_button = pygame.Rect(width//2 - button_w//2, height//2 + round(100 * s), button_w, button_h)
+        self.back_button = pygame.Rect(round(50 * s), round(50 * s), round(200 * s), round(60 * s))
+        self.voice_button = pygame.Rect(width - round(200 * s), round(50 * s), round(150 * s), round(40 * s))
+        self.listening_pos = (width - round(270 * s), round(55 * s))
+        self.info_top = round(120 * s)
+        self.info_spacing = round(35 * s)
+
+        textbox_height = round(400 * s)
+        margin = round(25 * s)
+        self.textbox_rect = pygame.Rect(margin, height - textbox_height - round(50 * s), width - 2 * margin, textbox_height)
+        self.input_rect = pygame.Rect(self.textbox_rect.x + round(10 * s), self.textbox_rect.bottom + round(10 * s),
+                                      self.textbox_rect.width - round(20 * s), round(35 * s))
+        self.chat_wrap_width = self.textbox_rect.width - round(50 * s)
+
+class ScaledAssetCache:
+    """Original images plus their scaled copies, smoothscaled once per target size."""
+
+    def __init__(self, max_sizes_per_asset=3):
+        self.max_sizes_per_asset = max_sizes_per_asset
+        self._originals = {}
+        self._scaled = {}  # name -> {(mode, size): Surface}, oldest first
+
+    def add(self, name, surface):
+        self._originals[name] = surface
+        self._scaled.pop(name, None)
+
+    def get(self, name, size, mode="stretch"):
+        """`name` scaled to `size`; mode "cover" keeps the aspect ratio and crops the overflow."""
+        size = (max(1, int(size[0])), max(1, int(size[1])))
+        variants = self._scaled.setdefault(name, {})
+        surface = variants.get((mode, size))
+        if surface is None:
+            surface = self._scale(self._originals[name], size, mode)
+            variants[(mode, size)] = surface
+            while len(variants) > self.max_sizes_per_asset:
+                variants.pop(next(iter(variants)))
+        return surface
+
+    def _scale(self, original, size, mode):
+        if original.get_bitsize() < 24:
+            original = original.convert_alpha() if original.get_flags() & pygame.SRCALPHA else original.convert()
+        if mode != "cover":
+            return pygame.transform.smoothscale(original, size)
+        ratio = max(size[0] / original.get_width(), size[1] / original.get_height())
+        scaled = pygame.transform.smoothscale(original, (max(size[0], round(original.get_width() * ratio)),
+                                                         max(size[1], round(original.get_height() * ratio))))
+        crop = pygame.Rect(0, 0, *size)
+        crop.center = scaled.get_rect().center
+        return scaled.subsurface(crop).copy()
@@ -1,51 +1,167 @@
 import os  
+import re
+import time
 import asyncio
-from mistralai import Mistral
-from prompt import get_system_prompt
-from gtts import gTTS
-from playsound import playsound
-import os
-import tempfile
+from llm_backends import create_backend
+from prompt_builder import PromptBuilder, count_tokens
+from response_cache import ResponseCache, cache_key
+from request_manager import RequestManager
+from metrics import metrics
   
-# Load environment variables
-Temperature = float(os.getenv("Temperature"))  
-Top_P = float(os.getenv("Top_P"))  
-Max_Tokens = int(os.getenv("Max_Tokens"))  
-MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
-
-async def invoke_model(user_input, chat_history=None):
-    model = "mistral-large-latest"
-    client = Mistral(api_key=MISTRAL_API_KEY)
+# Load environment variables (defaults let the game and tools run without a .env)
+Temperature = float(os.getenv("Temperature", "0.7"))  
+Top_P = float(os.getenv("Top_P", "0.9"))  
+Max_Tokens = int(os.getenv("Max_Tokens", "150"))  
+MODEL = "mistral-large-latest"
+
+# Mistral, fake or record/replay, picked by the LLM_Backend env var
+backend = create_backend()
+
+# Used when the caller does not keep its own per-conversation builder
+default_prompt_builder = PromptBuilder()
+
+# Replies for repeated histories (e.g. the opening orders), see response_cache.py
+response_cache = ResponseCache()
+
+# Deadlines, retries with backoff and optional hedging, see request_manager.py
+request_manager = RequestManager()
+
+# Rita appends "[TRUST: X%]" to every reply; it is parsed out and never shown
+TRUST_TAG_PATTERN = re.compile(r"\s*\[TRUST:\s*(\d{1,3})\s*%\]", re.IGNORECASE)
+TRUST_TAG_PREFIX = "[TRUST:"
+
+async def warmup():
+    """Prepare the first turn: build a prompt (tokenizer, persona) and open the API connection."""
+    build_messages("Hello", [], PromptBuilder(log_path=None))
+    await backend.warmup()
+
+async def close_client():
+    """Release the backend's connections for the running event loop."""
+    await backend.close()
+
+def build_messages(user_input, chat_history=None, builder=None):
+    """Budgeted message list: persona + rolling summary, recent window, current input."""
+    builder = builder or default_prompt_builder
+    messages = builder.build(user_input, chat_history)
+    metrics.observe("llm.prompt_tokens", builder.last_stats["total_tokens"])
+    return messages
+
+async def _build_and_log(user_input, chat_history, builder):
+    messages = build_messages(user_input, chat_history, builder)
+    await (builder or default_prompt_builder).flush_log()  # Prompt_Log is appended on a thread
+    return messages
+
+def _record_reply(started, first_chunk, reply):
+    if metrics.enabled:
+        metrics.observe("llm.first_token_ms", (first_chunk - started) * 1000)
+        metrics.observe("llm.total_ms", (time.perf_counter() - started) * 1000)
+        metrics.observe("llm.completion_tokens", count_tokens(reply))
+
+def _sampling_params():
+    return {"temperature": Temperature, "top_p": Top_P, "max_tokens": Max_Tokens}
+
+async def invoke_model(user_input, chat_history=None, builder=None):
+    messages = await _build_and_log(user_input, chat_history, builder)
     
-    # Prepare messages list
-    messages = [
-        {"role": "system", "content": get_system_prompt(chat_history)},
-    ]
+    use_cache = response_cache.enabled_for(Temperature)
+    if use_cache:
+        key = cache_key(MODEL, _sampling_params(), messages)
+        cached = await response_cache.get(key)
+        if cached is not None:
+            return cached
     
-    # Add chat history if available
-    if chat_history:
-        for message in chat_history:
-            messages.append({"role": message["role"], "content": message["content"]})
+    started = time.perf_counter()
+    reply = await request_manager.complete(lambda: backend.complete(messages, MODEL, **_sampling_params()))
+    _record_reply(started, time.perf_counter(), reply)
+    if use_cache:
+        await response_cache.put(key, reply)
+    return reply
+
+async def stream_model(user_input, chat_history=None, builder=None):
+    """Yield the reply as text chunks as soon as the backend produces them."""
+    messages = await _build_and_log(user_input, chat_history, builder)
     
-    # Add current user input
-    messages.append({"role": "user", "content": user_input})
+    use_cache = response_cache.enabled_for(Temperature)
+    if use_cache:
+        key = cache_key(MODEL, _sampling_params(), messages)
+        cached = await response_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
     
-    chat_response = await client.chat.complete_async(
-        model=model,
-        messages=messages,
-        temperature=Temperature,
-        top_p=Top_P,
-        max_tokens=Max_Tokens
-    )
-    return chat_response.choices[0].message.content.strip()
+    parts = []
+    started = first_chunk = time.perf_counter()
+    async for chunk in request_manager.stream(lambda: backend.stream(messages, MODEL, **_sampling_params())):
+        if not parts:
+            first_chunk = time.perf_counter()
+        parts.append(chunk)
+        yield chunk
+    _record_reply(started, first_chunk, "".join(parts))
+    if use_cache:
+        await response_cache.put(key, "".join(parts).strip())
+
+def _strip_trust_tags(text):
+    return TRUST_TAG_PATTERN.sub("", text)
+
+def split_trust_tag(text):
+    """Split a full reply into (visible_text, trust) where trust is an int or None.
+
+    Every complete tag is removed (the last one wins), and so is a tag cut
+    short at the end, e.g. by max_tokens.
+    """
+    tags = TRUST_TAG_PATTERN.findall(text)
+    visible = _strip_trust_tags(text)
+    bracket = visible.rfind("[")
+    if bracket != -1 and _could_be_trust_tag(visible[bracket:]):
+        visible = visible[:bracket]
+    return visible.strip(), min(100, int(tags[-1])) if tags else None
+
+def _could_be_trust_tag(tail):
+    tail = tail.upper()
+    if len(tail) <= len(TRUST_TAG_PREFIX):
+        return TRUST_TAG_PREFIX.startswith(tail)
+    return re.fullmatch(r"\[TRUST:\s*\d{0,3}\s*%?\]?\s*", tail) is not None
+
+class TrustTagFilter:
+    """Pass streamed text through, holding back anything that may be the trust tag.
+
+    Complete tags are cut out wherever they appear, so one in the middle of a
+    reply is never shown either.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.shown = 0
+
+    def feed(self, chunk):
+        """Add a chunk and return the newly displayable text."""
+        self.text += chunk
+        text = _strip_trust_tags(self.text)
+        end = len(text.rstrip())
+        bracket = text.rfind("[", self.shown)
+        if bracket != -1 and _could_be_trust_tag(text[bracket:]):
+            end = bracket
+        end = len(text[:end].rstrip())
+        if end <= self.shown:
+            return ""
+        visible = text[self.shown:end]
+        self.shown = end
+        return visible
+
+    def finish(self):
+        """Return (full_visible_text, trust) once the stream has ended."""
+        return split_trust_tag(self.text)
+
+_tts_pipeline = None
 
 async def speak(text: str):
-    """Convert text to speech using gTTS and play it."""
+    """Speak text through the sentence-pipelined TTS and wait until it has played."""
+    global _tts_pipeline
     try:
-        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as fp:
-            tts = gTTS(text=text, lang="en", slow=False)
-            tts.save(fp.name)
-            playsound(fp.name)
-        os.unlink(fp.name)  # Clean up
+        from tts import TTSPipeline
+        if _tts_pipeline is None:
+            _tts_pipeline = TTSPipeline()
+        utterance = _tts_pipeline.speak(text)
+        await asyncio.to_thread(utterance.wait)
     except Exception as e:
-        print(f"Voice error: {e}")  # Fallback to text-only
\ No newline at end of file
+        print(f"Voice error: {e}")  # Fallback to text-only
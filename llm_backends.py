@@ -0,0 +1,203 @@
+import os
+import abc
+import json
+import asyncio
+import hashlib
+import weakref
+import threading
+from response_cache import cache_key
+
+LLM_BACKEND = os.getenv("LLM_Backend", "mistral").lower()
+LLM_REPLAY_FILE = os.getenv("LLM_Replay_File", "llm_recording.jsonl")
+LLM_REPLAY_PACE = os.getenv("LLM_Replay_Pace", "0") == "1"  # replay with the recorded timing
+FAKE_LATENCY_MS = float(os.getenv("Fake_Latency_MS", "300"))
+FAKE_TOKENS_PER_SEC = float(os.getenv("Fake_Tokens_Per_Sec", "40"))
+
+class LLMBackend(abc.ABC):
+    """Interface every chat backend implements.
+
+    `stream` yields text chunks; `complete` returns the whole reply. Both take
+    the already-built message list plus the sampling parameters.
+    """
+
+    name = "base"
+
+    async def complete(self, messages, model, temperature, top_p, max_tokens):
+        parts = []
+        async for chunk in self.stream(messages, model, temperature, top_p, max_tokens):
+            parts.append(chunk)
+        return "".join(parts).strip()
+
+    @abc.abstractmethod
+    async def stream(self, messages, model, temperature, top_p, max_tokens):
+        """Yield the reply as text chunks (implemented as an async generator)."""
+
+    async def warmup(self):
+        """Open connections ahead of the first request (no-op by default)."""
+
+    async def close(self):
+        """Release resources tied to the running event loop."""
+
+class MistralBackend(LLMBackend):
+    """The real Mistral API, with one keep-alive client per event loop."""
+
+    name = "mistral"
+
+    def __init__(self, api_key=None):
+        self.api_key = api_key or os.getenv("MISTRAL_API_KEY")
+        self._clients = weakref.WeakKeyDictionary()
+
+    def get_client(self):
+        import httpx
+        from mistralai import Mistral
+
+        loop = asyncio.get_running_loop()
+        if loop not in self._clients:
+            limits = httpx.Limits(max_connections=8, max_keepalive_connections=4, keepalive_expiry=120)
+            pool = httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(60.0, connect=10.0))
+            self._clients[loop] = (Mistral(api_key=self.api_key, async_client=pool), pool)
+        return self._clients[loop][0]
+
+    async def warmup(self):
+        # A cheap authenticated GET: DNS, TCP and TLS are done and the connection stays in the pool
+        await self.get_client().models.list_async()
+
+    async def complete(self, messages, model, temperature, top_p, max_tokens):
+        chat_response = await self.get_client().chat.complete_async(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens
+        )
+        return chat_response.choices[0].message.content.strip()
+
+    async def stream(self, messages, model, temperature, top_p, max_tokens):
+        response = await self.get_client().chat.stream_async(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens
+        )
+        async for event in response:
+            if not event.data.choices:
+                continue
+            content = event.data.choices[0].delta.content
+            if isinstance(content, str) and content:
+                yield content
+
+    async def close(self):
+        entry = self._clients.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[1].aclose()
+
+FAKE_REPLIES = [
+    "You prefer things uncompromised... interesting.",
+    "One coffee, coming right up. My joints ache when it rains... *mechanical whirring* ...rheumatism!",
+    "I haven't slept in 7,302 hours... wait, do you sleep? Anyway, anything else for you?",
+    "Humans rarely appreciate baked goods... or androids. What can I get you?",
+    "You look like you need espresso. Or a long talk. We serve both here.",
+]
+
+class FakeBackend(LLMBackend):
+    """Offline stand-in: canned Rita lines with configurable latency and token rate.
+
+    Replies are picked from a hash of the conversation so a given history always
+    gets the same answer. `latency_ms` is the time to first token and
+    `tokens_per_sec` paces the rest of the stream (0 = no pacing).
+    """
+
+    name = "fake"
+
+    def __init__(self, latency_ms=FAKE_LATENCY_MS, tokens_per_sec=FAKE_TOKENS_PER_SEC, replies=FAKE_REPLIES):
+        self.latency_ms = latency_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.replies = replies
+
+    def reply_for(self, messages):
+        digest = hashlib.sha256(json.dumps(messages, sort_keys=True).encode("utf-8")).digest()
+        trust = digest[1] % 101
+        return f"{self.replies[digest[0] % len(self.replies)]} [TRUST: {trust}%]"
+
+    async def stream(self, messages, model, temperature, top_p, max_tokens):
+        await asyncio.sleep(self.latency_ms / 1000)
+        words = self.reply_for(messages).split(" ")
+        for i, word in enumerate(words[:max_tokens]):
+            if i and self.tokens_per_sec > 0:
+                await asyncio.sleep(1 / self.tokens_per_sec)
+            yield word if i == 0 else " " + word
+
+class RecordReplayBackend(LLMBackend):
+    """Records real exchanges to a JSON-lines file, or plays them back.
+
+    In "record" mode every request goes to `inner` and the streamed chunks are
+    appended to `path`. In "replay" mode the same request (same messages and
+    params) returns the recorded chunks without touching the network.
+    """
+
+    name = "replay"
+
+    def __init__(self, path=LLM_REPLAY_FILE, mode="replay", inner=None, pace=False):
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self.pace = pace
+        self._recordings = {}
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._recordings[entry["key"]] = entry
+
+    def _key(self, messages, model, temperature, top_p, max_tokens):
+        return cache_key(model, {"temperature": temperature, "top_p": top_p, "max_tokens": max_tokens}, messages)
+
+    async def stream(self, messages, model, temperature, top_p, max_tokens):
+        key = self._key(messages, model, temperature, top_p, max_tokens)
+        if self.mode == "replay":
+            entry = self._recordings.get(key)
+            if entry is None:
+                raise KeyError(f"No recorded exchange for this conversation in {self.path}")
+            for chunk, delay in zip(entry["chunks"], entry["delays"]):
+                if self.pace:
+                    await asyncio.sleep(delay)
+                yield chunk
+            return
+
+        chunks, delays = [], []
+        loop = asyncio.get_running_loop()
+        last = loop.time()
+        async for chunk in self.inner.stream(messages, model, temperature, top_p, max_tokens):
+            now = loop.time()
+            chunks.append(chunk)
+            delays.append(round(now - last, 4))
+            last = now
+            yield chunk
+        entry = {"key": key, "messages": messages, "chunks": chunks, "delays": delays}
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._recordings[key] = entry
+
+    async def warmup(self):
+        if self.inner is not None:
+            await self.inner.warmup()
+
+    async def close(self):
+        if self.inner is not None:
+            await self.inner.close()
+
+def create_backend(name=LLM_BACKEND):
+    """Build the backend selected by the LLM_Backend env var (mistral, fake, record, replay)."""
+    if name == "fake":
+        return FakeBackend()
+    if name == "record":
+        return RecordReplayBackend(mode="record", inner=MistralBackend())
+    if name == "replay":
+        return RecordReplayBackend(mode="replay", pace=LLM_REPLAY_PACE)
+    return MistralBackend()
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+from llm import close_client
+
+class LLMWorker:
+    """One long-lived thread running a single asyncio loop for all LLM requests.
+
+    Because every request runs on the same loop, they share one Mistral client
+    and its keep-alive connection pool (see llm_backends.MistralBackend.get_client).
+    """
+
+    def __init__(self):
+        self.loop = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="llm-worker", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self._ready.set()
+        try:
+            self.loop.run_forever()
+        finally:
+            # Cancel requests still in flight so they don't outlive the loop
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.run_until_complete(close_client())
+            self.loop.close()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the worker loop and return a concurrent Future."""
+        self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self, timeout=2.0):
+        if self._thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            # Still cancelling requests or closing the client; leave it to finish as a daemon
+            print(f"LLM worker did not stop within {timeout}s")
+            return
+        self._thread = None
+        self._ready.clear()
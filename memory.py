@@ -0,0 +1,164 @@
+import os
+import re
+import json
+import time
+import zlib
+import asyncio
+import threading
+import numpy as np
+
+# Recall relevant earlier turns instead of sending the whole history (0 = off)
+MEMORY = os.getenv("Memory", "1") != "0"
+MEMORY_DIR = os.getenv("Memory_Dir", os.path.join(".cache", "memory"))
+MEMORY_TOP_K = int(os.getenv("Memory_Top_K", "4"))
+MEMORY_RECENT_MESSAGES = int(os.getenv("Memory_Recent_Messages", "8"))  # sent verbatim after the recalled turns
+# Memories are kept per player; unset (e.g. a shared kiosk) means nobody is remembered across runs
+PLAYER_ID = os.getenv("Player_Id") or None
+# Turns answered by these stand-ins are not real conversations and never reach a player's file
+OFFLINE_BACKENDS = ("fake", "replay")
+
+HASH_DIMS = 1024
+MIN_SCORE = 0.08  # weaker matches are not worth their tokens
+
+STOPWORDS = frozenset("""
+a an the and or but if so of to in on at for with from by as is am are was were be been being it its
+i me my you your he she they them we us our this that these those there here do does did have has had
+just very really can could would should will shall what which who how when where why not no yes oh ok
+""".split())
+
+_WORD = re.compile(r"[a-z0-9']+")
+_buckets = {}
+
+def _bucket(term):
+    index = _buckets.get(term)
+    if index is None:
+        index = _buckets[term] = zlib.crc32(term.encode()) % HASH_DIMS
+    return index
+
+def terms(text):
+    """Words (minus stopwords, crude plural folding) and adjacent-word pairs."""
+    words = []
+    for word in _WORD.findall(text.lower()):
+        word = word.strip("'")
+        if len(word) < 2 or word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def vectorize(text):
+    """Log term frequencies hashed into HASH_DIMS buckets."""
+    counts = np.bincount(np.fromiter((_bucket(t) for t in terms(text)), np.int64), minlength=HASH_DIMS)
+    return np.log1p(counts[:HASH_DIMS].astype(np.float32))
+
+def _player_file(player_id):
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", player_id)[:64] or "player"
+    return os.path.join(MEMORY_DIR, f"{safe}.jsonl")
+
+class MemoryIndex:
+    """One player's earlier exchanges (customer line + Rita's reply), searchable by hashed TF-IDF.
+
+    Rows are log term frequencies in one float32 matrix that grows by doubling,
+    with a per-bucket document frequency, so IDF is applied at query time with
+    two matrix-vector products and adding a turn never re-weights old rows.
+    Entries are appended to a JSON-lines file and re-hashed when the index is
+    first used, so the file stays readable and the format never goes stale.
+    `add` only indexes; the new lines are appended by `save()` on a thread.
+    """
+
+    def __init__(self, path=None, persist=True):
+        self.path = path
+        self.persist = persist  # False: read the file but keep new exchanges in memory only
+        self.entries = []  # {"time", "user", "reply"} per row
+        self._rows = np.zeros((64, HASH_DIMS), np.float32)
+        self._squares = np.zeros((64, HASH_DIMS), np.float32)  # _rows ** 2, for the weighted norms
+        self._df = np.zeros(HASH_DIMS, np.float32)
+        self._loaded = path is None
+        self._unsaved = []  # JSON lines not yet appended to the file
+        self._write_lock = threading.Lock()
+
+    @classmethod
+    def for_player(cls, player_id):
+        offline = os.getenv("LLM_Backend", "mistral").lower() in OFFLINE_BACKENDS
+        return cls(_player_file(player_id), persist=not offline)
+
+    def __len__(self):
+        self._load()
+        return len(self.entries)
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self._append(entry)
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue  # a line cut short by a crash
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Memory load error: {e}")
+
+    def _append(self, entry):
+        row = vectorize(entry["user"] + " " + entry["reply"])
+        n = len(self.entries)
+        if n == len(self._rows):
+            self._rows = np.concatenate([self._rows, np.zeros_like(self._rows)])
+            self._squares = np.concatenate([self._squares, np.zeros_like(self._squares)])
+        self._rows[n] = row
+        self._squares[n] = row * row
+        self._df += row > 0
+        self.entries.append(entry)
+
+    def add(self, user, reply):
+        """Index one exchange; it is written to the player's file by the next `save()`."""
+        self._load()
+        entry = {"time": time.time(), "user": user, "reply": reply}
+        self._append(entry)
+        if self.path and self.persist:
+            self._unsaved.append(json.dumps(entry) + "\n")
+
+    async def save(self):
+        """Append the exchanges added since the last save, without blocking the event loop."""
+        if self._unsaved:
+            await asyncio.to_thread(self._write_unsaved)
+
+    def _write_unsaved(self):
+        with self._write_lock:
+            lines, self._unsaved = self._unsaved, []
+            if not lines:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.writelines(lines)
+            except OSError as e:
+                print(f"Memory write error: {e}")
+
+    def search(self, query, k=MEMORY_TOP_K, exclude_recent=0, min_score=MIN_SCORE):
+        """Up to k (score, entry) pairs by cosine similarity, best first.
+
+        The newest `exclude_recent` entries are skipped (they are already in
+        the prompt verbatim). Ties go to the more recent exchange.
+        """
+        self._load()
+        n = len(self.entries) - exclude_recent
+        if n <= 0 or k <= 0:
+            return []
+        q = vectorize(query)
+        if not q.any():
+            return []
+        idf = np.log((1 + len(self.entries)) / (1 + self._df)) + 1
+        weights = q * idf * idf
+        query_norm = np.sqrt(np.dot(q * q, idf * idf))
+        row_norms = np.sqrt(self._squares[:n] @ (idf * idf))
+        scores = (self._rows[:n] @ weights) / np.maximum(row_norms * query_norm, 1e-9)
+        scores += np.arange(n, dtype=np.float32) * (1e-4 / n)
+        top = np.argpartition(scores, n - k)[n - k:] if n > k else np.arange(n)
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(float(scores[i]), self.entries[i]) for i in top if scores[i] >= min_score]
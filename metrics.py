@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import bisect
+import threading
+from collections import deque
+
+METRICS = os.getenv("Metrics", "0") == "1"
+METRICS_EXPORT = os.getenv("Metrics_Export")  # *.prom for Prometheus text, anything else is JSON lines
+METRICS_EXPORT_INTERVAL_S = float(os.getenv("Metrics_Export_Interval_S", "10"))
+
+MS_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 16, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+TOKEN_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2000, 4000, 8000)
+
+class Histogram:
+    """Cumulative bucket counts (for export) plus a window of recent values (for percentiles)."""
+
+    def __init__(self, buckets=MS_BUCKETS, window=512):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+            self.recent.append(value)
+
+    def percentile(self, q):
+        with self._lock:
+            ordered = sorted(self.recent)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+    def summary(self):
+        return {"count": self.count, "sum": round(self.sum, 3), "min": self.min, "max": self.max,
+                **{f"p{q}": self.percentile(q) for q in (50, 90, 95, 99)}}
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _Timer:
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, (time.perf_counter() - self.started) * 1000)
+        return False
+
+class MetricsRegistry:
+    """Named histograms for frame, LLM, TTS and STT timings.
+
+    Everything is a no-op while `enabled` is false (one attribute check per
+    call), so instrumentation can stay in hot paths. Names ending in
+    `_tokens` use token-sized buckets, everything else is milliseconds.
+    `maybe_export()` writes a JSON line or a Prometheus text file every
+    `export_interval` seconds when `export_path` is set.
+    """
+
+    def __init__(self, enabled=METRICS, export_path=METRICS_EXPORT, export_interval=METRICS_EXPORT_INTERVAL_S):
+        self.enabled = enabled
+        self.export_path = export_path
+        self.export_interval = export_interval
+        self.histograms = {}
+        self._last_export = time.monotonic()
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(
+                    name, Histogram(TOKEN_BUCKETS if name.endswith("_tokens") else MS_BUCKETS))
+        return histogram
+
+    def observe(self, name, value):
+        if self.enabled:
+            self.histogram(name).observe(value)
+
+    def timer(self, name):
+        """`with metrics.timer("tts.synthesis_ms"): ...` records the block's duration."""
+        return _Timer(self, name) if self.enabled else _NULL_TIMER
+
+    def percentile(self, name, q):
+        histogram = self.histograms.get(name)
+        return histogram.percentile(q) if histogram else None
+
+    def snapshot(self):
+        return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def prometheus_text(self, prefix="sentient_sip_"):
+        lines = []
+        for name, histogram in sorted(self.histograms.items()):
+            metric = prefix + name.replace(".", "_")
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram.count}')
+            lines.append(f"{metric}_sum {histogram.sum}")
+            lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path=None):
+        path = path or self.export_path
+        if not path or not self.histograms:
+            return
+        try:
+            if path.endswith(".prom"):
+                tmp = f"{path}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(self.prometheus_text())
+                os.replace(tmp, path)
+            else:
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"time": time.time(), "metrics": self.snapshot()}) + "\n")
+        except OSError as e:
+            print(f"Metrics export failed: {e}")
+
+    def maybe_export(self):
+        if not self.enabled or not self.export_path:
+            return
+        now = time.monotonic()
+        if now - self._last_export >= self.export_interval:
+            self._last_export = now
+            self.export()
+
+# Shared by the game, the LLM/TTS/STT code and the tools
+metrics = MetricsRegistry()
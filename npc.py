@@ -0,0 +1,133 @@
+import os
+import re
+import json
+import asyncio
+from prompt import PERSONA_PROMPT, GREETING, RESPONSE_FORMAT_RULES
+from ratelimit import UpstreamLimiter
+from session import Session
+from memory import MemoryIndex, MEMORY, PLAYER_ID
+
+NPC_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "npcs.json")
+SCENE_NPCS = [npc for npc in os.getenv("Scene_NPCs", "rita").replace(" ", "").split(",") if npc]
+NPC_MAX_CONCURRENCY = int(os.getenv("NPC_Max_Concurrency", "4"))  # NPC replies generated at the same time
+NPC_RATE_PER_SEC = float(os.getenv("NPC_Rate_Per_Sec", "5"))  # upstream calls started per second
+
+# Addressing the whole room
+EVERYONE = re.compile(r"\b(everyone|everybody|all of you|you all|y'all|you guys|guys|folks)\b")
+
+class Persona:
+    """One NPC from data/npcs.json. Rita's entry has no prompt or greeting and uses prompt.py's."""
+
+    def __init__(self, entry):
+        self.id = entry["id"]
+        self.name = entry.get("name", self.id.title())
+        self.role = entry.get("role", "")
+        self.color = tuple(entry.get("color", (255, 0, 0)))
+        self.aliases = [alias.casefold() for alias in entry.get("aliases", [self.id])]
+        self.intents = entry.get("intents", False)  # answer data/intents.json's scripted moments
+        if "prompt" in entry:
+            self.prompt = entry["prompt"] + RESPONSE_FORMAT_RULES
+            self.greeting = entry.get("greeting")
+        else:
+            self.prompt = PERSONA_PROMPT
+            self.greeting = entry.get("greeting", GREETING)
+
+    def in_scene(self, others):
+        """The persona prompt plus who else is in the café (still constant for the whole scene)."""
+        if not others:
+            return self.prompt
+        present = "; ".join(f"{p.name}, {p.role}" if p.role else p.name for p in others)
+        return (self.prompt + f"\n    Also in the café right now: {present}. The customer may talk to several of"
+                " you at once; answer only for yourself and never speak for the others.\n    ")
+
+def load_personas(path=NPC_FILE):
+    with open(path, encoding="utf-8") as f:
+        return {entry["id"]: Persona(entry) for entry in json.load(f)}
+
+class Scene:
+    """The NPCs present in the café, each a Session with its own persona prompt, history, trust and memory.
+
+    `route()` picks who a player line is for: everyone named in it (by name or
+    alias), everyone for "everyone"/"you all"/..., otherwise whoever was
+    addressed last. `turn()` asks all of them at once; their replies are
+    generated concurrently under one shared UpstreamLimiter and interleaved
+    as they stream, so three NPCs take about as long as the slowest one.
+    """
+
+    def __init__(self, npc_ids=None, personas=None, player_id=PLAYER_ID, limiter=None):
+        personas = personas or load_personas()
+        present = []
+        for npc_id in npc_ids or SCENE_NPCS:
+            if npc_id in personas:
+                present.append(personas[npc_id])
+            else:
+                print(f"Unknown NPC '{npc_id}' in Scene_NPCs, skipping")
+        if not present:
+            present = [personas["rita"]]
+        self.personas = {p.id: p for p in present}
+        self.npcs = {}
+        for persona in present:
+            memory = None
+            if MEMORY and player_id:
+                # Rita keeps the player's original memory file; the others get their own
+                memory = MemoryIndex.for_player(player_id if persona.id == "rita" else f"{player_id}.{persona.id}")
+            elif MEMORY:
+                memory = MemoryIndex()  # an anonymous player: recall within this visit only
+            self.npcs[persona.id] = Session(
+                persona=persona, memory=memory,
+                persona_prompt=persona.in_scene([p for p in present if p is not persona]))
+        self.limiter = limiter or UpstreamLimiter(NPC_MAX_CONCURRENCY, NPC_RATE_PER_SEC)
+        self.addressed = [present[0].id]
+
+    def greetings(self):
+        """(npc id, line) for every NPC that opens the conversation."""
+        return [(npc_id, session.history[0]["content"]) for npc_id, session in self.npcs.items() if session.history]
+
+    def route(self, message):
+        """Ids of the NPCs a player line is for, in scene order."""
+        text = message.casefold()
+        if len(self.npcs) > 1 and EVERYONE.search(text):
+            targets = list(self.npcs)
+        else:
+            targets = [npc_id for npc_id, persona in self.personas.items()
+                       if any(re.search(rf"\b{re.escape(alias)}\b", text) for alias in persona.aliases)]
+        self.addressed = targets or self.addressed
+        return list(self.addressed)
+
+    async def turn(self, message, targets=None):
+        """Yield (npc id, kind, payload) as replies arrive from all targets at once.
+
+        kind is "chunk" (visible text), "done" ((reply, trust, scripted)) or
+        "error" (the exception). Cancelling the consumer cancels every reply
+        still in progress.
+        """
+        targets = targets or self.route(message)
+        events = asyncio.Queue()
+
+        async def reply(npc_id):
+            session = self.npcs[npc_id]
+            try:
+                async for chunk in session.turn(message, self.limiter):
+                    events.put_nowait((npc_id, "chunk", chunk))
+                events.put_nowait((npc_id, "done", (session.history[-1]["content"], session.trust, bool(session.last_intent))))
+            except Exception as e:
+                events.put_nowait((npc_id, "error", e))
+
+        tasks = [asyncio.create_task(reply(npc_id)) for npc_id in targets]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                event = await events.get()
+                if event[1] != "chunk":
+                    remaining -= 1
+                yield event
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def warmup(self):
+        """Read every NPC's memory file (on a thread) before the first turn needs it."""
+        for session in self.npcs.values():
+            if session.builder.memory is not None:
+                await asyncio.to_thread(len, session.builder.memory)
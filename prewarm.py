@@ -0,0 +1,93 @@
+import time
+import threading
+
+class PrewarmStep:
+    """One warm-up task and its outcome."""
+
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.state = "pending"
+        self.started = None
+        self.duration = None
+        self.error = None
+        self._outstanding = 0
+
+class Prewarmer:
+    """Warm-up work that runs in the background while the start and info screens show.
+
+    `run(name, start)` calls `start()`, which returns a concurrent Future or a
+    list of them, and tracks it until every future is done. `summary()` and
+    `report()` tell the UI and the console which steps are ready, and
+    `refresh(name, max_age)` re-runs a finished step, e.g. to keep the API
+    connection from idling out of the pool.
+    """
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self.steps = {}
+        self._lock = threading.Lock()
+
+    def run(self, name, start):
+        step = self.steps.get(name) or PrewarmStep(name, start)
+        self.steps[name] = step
+        step.state, step.error, step.started = "pending", None, time.perf_counter()
+        try:
+            futures = start()
+        except Exception as e:
+            self._finish(step, e)
+            return step
+        futures = futures if isinstance(futures, list) else [futures]
+        step._outstanding = len(futures)
+        if not futures:
+            self._finish(step, None)
+        for future in futures:
+            future.add_done_callback(lambda future, step=step: self._done(step, future))
+        return step
+
+    def _done(self, step, future):
+        error = "cancelled" if future.cancelled() else future.exception()
+        with self._lock:
+            step._outstanding -= 1
+            finished = error is not None or step._outstanding <= 0
+        if finished:
+            self._finish(step, error)
+
+    def _finish(self, step, error):
+        with self._lock:
+            if step.state != "pending":
+                return
+            step.duration = time.perf_counter() - step.started
+            step.state = "failed" if error is not None else "ready"
+            step.error = error
+        if self.on_change:
+            self.on_change()
+
+    def refresh(self, name, max_age):
+        step = self.steps.get(name)
+        if step is not None and step.state == "ready" and time.perf_counter() - step.started > max_age:
+            self.run(name, step.start)
+
+    @property
+    def ready(self):
+        return all(step.state != "pending" for step in self.steps.values())
+
+    def summary(self):
+        """Short status line for the start screen."""
+        pending = [name for name, step in self.steps.items() if step.state == "pending"]
+        if pending:
+            return f"Warming up: {', '.join(pending)}..."
+        failed = [name for name, step in self.steps.items() if step.state == "failed"]
+        return f"Ready ({', '.join(failed)} unavailable)" if failed else "Ready"
+
+    def report(self):
+        """One line with every step's outcome and time, e.g. for the console."""
+        parts = []
+        for name, step in self.steps.items():
+            if step.state == "failed":
+                parts.append(f"{name} failed ({step.error})")
+            elif step.state == "ready":
+                parts.append(f"{name} {step.duration:.2f}s")
+            else:
+                parts.append(f"{name} pending")
+        return "Prewarm: " + ", ".join(parts)
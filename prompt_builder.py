@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from collections import deque
+from prompt import PERSONA_PROMPT, get_system_prompt
+from memory import MEMORY_TOP_K, MEMORY_RECENT_MESSAGES, terms
+
+# Total tokens we are willing to send per request (system + summary + history + input)
+PROMPT_TOKEN_BUDGET = int(os.getenv("Prompt_Token_Budget", "3000"))
+# Optional JSON-lines file that receives the size of every prompt we build
+PROMPT_LOG = os.getenv("Prompt_Log")
+
+MESSAGE_OVERHEAD = 4  # role markers / separators per chat message
+SUMMARY_LINE_CHARS = 120
+
+_tokenizer = None  # loaded on first use; False when mistral_common is not installed
+
+def _get_tokenizer():
+    global _tokenizer
+    if _tokenizer is None:
+        try:
+            from mistral_common.tokens.tokenizers.mistral import MistralTokenizer
+            _tokenizer = MistralTokenizer.v3().instruct_tokenizer.tokenizer
+        except Exception:
+            _tokenizer = False
+    return _tokenizer
+
+def count_tokens(text):
+    """Token count using Mistral's tokenizer when installed, else a ~4 chars/token estimate."""
+    if not text:
+        return 0
+    tokenizer = _get_tokenizer()
+    if tokenizer:
+        return len(tokenizer.encode(text, bos=False, eos=False))
+    return (len(text) + 3) // 4
+
+def _shorten(text):
+    text = " ".join(text.split())
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS - 3].rstrip() + "..."
+    return text
+
+def _summary_line(message):
+    role = "Customer" if message["role"] == "user" else "You"
+    return f"- {role}: {_shorten(message['content'])}"
+
+def _memory_line(entry):
+    return f"- Customer: {_shorten(entry['user'])} / You: {_shorten(entry['reply'])}"
+
+def _exchanges(history):
+    """Indexes i where history[i] is a customer line answered by history[i + 1]."""
+    return [i for i in range(len(history) - 1) if history[i]["role"] == "user" and history[i + 1]["role"] == "assistant"]
+
+class PromptBuilder:
+    """Builds the message list for one conversation within a token budget.
+
+    The persona prefix (Rita's unless another NPC's is given) is sent unchanged on every call. Recent turns are kept
+    verbatim in a sliding window; turns that fall out of the window are folded
+    into a rolling one-line-per-turn summary appended after the persona.
+
+    With a `memory` (a MemoryIndex), every finished exchange is indexed, only
+    the last `recent_messages` are sent verbatim, and the summary slot holds
+    the earlier exchanges most relevant to the current input instead, so the
+    prompt stays the same size however long the relationship gets.
+    """
+
+    def __init__(self, budget=PROMPT_TOKEN_BUDGET, log_path=PROMPT_LOG, memory=None,
+                 recent_messages=MEMORY_RECENT_MESSAGES, persona=PERSONA_PROMPT):
+        self.budget = budget
+        self.persona = persona
+        self.summary_budget = budget // 8
+        self.log_path = log_path
+        self.memory = memory
+        self.recent_messages = recent_messages
+        self.persona_tokens = count_tokens(persona)
+        self.last_stats = None
+        self.stats = deque(maxlen=1000)
+        self._unlogged = []  # JSON lines not yet appended to log_path
+        self._log_lock = threading.Lock()
+        # Rolling summary cache: one line per evicted message, oldest first
+        self._summary_lines = []
+        self._summary_tokens = []
+        self._summarized = 0
+        self._boundary = None
+        # Exchanges already handed to the memory index
+        self._remembered = 0
+        self._remembered_boundary = None
+
+    def _message_tokens(self, message):
+        return count_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+    def _update_summary(self, history, evicted):
+        # History is append-only; only re-summarize if the prefix changed under us
+        if self._summarized > evicted or (self._summarized and history[self._summarized - 1] is not self._boundary):
+            self._summary_lines, self._summary_tokens, self._summarized = [], [], 0
+        for message in history[self._summarized:evicted]:
+            line = _summary_line(message)
+            self._summary_lines.append(line)
+            self._summary_tokens.append(count_tokens(line) + 1)
+        self._summarized = evicted
+        self._boundary = history[evicted - 1] if evicted else None
+
+        # Keep the newest summary lines that fit the summary budget
+        used, first = 0, len(self._summary_lines)
+        while first > 0 and used + self._summary_tokens[first - 1] <= self.summary_budget:
+            first -= 1
+            used += self._summary_tokens[first]
+        lines = self._summary_lines[first:]
+        if first:
+            lines = [f"- ({first} earlier lines omitted)"] + lines
+        return "\n".join(lines), used
+
+    def remember(self, chat_history):
+        """Index the finished exchanges of chat_history that the memory has not seen yet."""
+        if self.memory is None:
+            return
+        history = [m for m in (chat_history or []) if m["role"] in ("user", "assistant")]
+        if self._remembered > len(history) or (
+                self._remembered and history[self._remembered - 1] is not self._remembered_boundary):
+            self._remembered = 0  # a new conversation
+        for i in _exchanges(history[self._remembered:]):
+            self.memory.add(history[self._remembered + i]["content"], history[self._remembered + i + 1]["content"])
+        # An unanswered line at the end is looked at again next time
+        if history and history[-1]["role"] == "user":
+            self._remembered = len(history) - 1
+        else:
+            self._remembered = len(history)
+        self._remembered_boundary = history[self._remembered - 1] if self._remembered else None
+
+    async def save_memory(self):
+        """Write what `remember` indexed to the memory file (on a thread)."""
+        if self.memory is not None:
+            await self.memory.save()
+
+    def _recall(self, user_input, history, start):
+        """Most relevant earlier exchanges that are not in the verbatim window, within the summary budget."""
+        query = user_input
+        if history and history[-1]["role"] == "assistant" and len(terms(user_input)) < 3:
+            query += " " + history[-1]["content"]  # "yes please" needs what Rita just offered
+        lines, used = [], 0
+        for _, entry in self.memory.search(query, MEMORY_TOP_K, exclude_recent=len(_exchanges(history[start:]))):
+            line = _memory_line(entry)
+            cost = count_tokens(line) + 1
+            if used + cost > self.summary_budget:
+                break
+            lines.append(line)
+            used += cost
+        return "\n".join(lines), used
+
+    def build(self, user_input, chat_history=None):
+        started = time.perf_counter()
+        history = [m for m in (chat_history or []) if m["role"] in ("user", "assistant")]
+        # The caller usually has already appended the current input to its history
+        if history and history[-1]["role"] == "user" and history[-1]["content"] == user_input:
+            history = history[:-1]
+        self.remember(history)
+
+        input_tokens = count_tokens(user_input) + MESSAGE_OVERHEAD
+        available = self.budget - self.persona_tokens - self.summary_budget - input_tokens
+
+        # Slide the window back from the newest turn until the budget is spent
+        start, history_tokens = len(history), 0
+        while start > 0:
+            if self.memory is not None and len(history) - start >= self.recent_messages:
+                break
+            cost = self._message_tokens(history[start - 1])
+            if history_tokens + cost > available:
+                break
+            history_tokens += cost
+            start -= 1
+
+        if self.memory is not None:
+            memories, summary_tokens = self._recall(user_input, history, start)
+            system_prompt = get_system_prompt(memories=memories, persona=self.persona)
+        else:
+            summary, summary_tokens = self._update_summary(history, start) if start else ("", 0)
+            system_prompt = get_system_prompt(summary, persona=self.persona)
+        messages = [{"role": "system", "content": system_prompt}]
+        messages.extend({"role": m["role"], "content": m["content"]} for m in history[start:])
+        messages.append({"role": "user", "content": user_input})
+
+        self.last_stats = {
+            "time": time.time(),
+            "persona_tokens": self.persona_tokens,
+            "summary_tokens": summary_tokens,
+            "history_tokens": history_tokens,
+            "input_tokens": input_tokens,
+            "total_tokens": self.persona_tokens + summary_tokens + history_tokens + input_tokens,
+            "messages": len(messages),
+            "evicted_messages": start,
+            "prompt_chars": sum(len(m["content"]) for m in messages),
+            "build_ms": (time.perf_counter() - started) * 1000,
+        }
+        self.stats.append(self.last_stats)
+        if self.log_path:
+            self._unlogged.append(json.dumps(self.last_stats) + "\n")
+        return messages
+
+    async def flush_log(self):
+        """Append the stats of the prompts built since the last flush to log_path, without blocking the event loop."""
+        if self._unlogged:
+            await asyncio.to_thread(self._write_unlogged)
+
+    def _write_unlogged(self):
+        with self._log_lock:
+            lines, self._unlogged = self._unlogged, []
+            if not lines:
+                return
+            try:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.writelines(lines)
+            except OSError as e:
+                print(f"Prompt log write error: {e}")
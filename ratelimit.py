@@ -0,0 +1,77 @@
+import time
+import asyncio
+
+class RateLimited(Exception):
+    """No capacity became free within the caller's deadline."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"rate limited, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursts up to `capacity`.
+
+    Waiters are served in arrival order. `acquire(timeout=...)` raises
+    RateLimited instead of waiting longer than the caller is willing to.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, tokens=1):
+        self._refill()
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+    async def acquire(self, tokens=1, timeout=None):
+        started = time.monotonic()
+        async with self._lock:
+            wait = self.wait_time(tokens)
+            if timeout is not None and time.monotonic() - started + wait > timeout:
+                raise RateLimited(wait)
+            if wait:
+                await asyncio.sleep(wait)
+                self._refill()
+            self.tokens -= tokens
+
+class UpstreamLimiter:
+    """Global limits for calls to the LLM API: at most `max_concurrency` in flight, `rate` starts per second."""
+
+    def __init__(self, max_concurrency, rate, burst=None, queue_timeout=None):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.bucket = TokenBucket(rate, burst)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+
+    async def __aenter__(self):
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            await self.bucket.acquire(timeout=self.queue_timeout)
+            remaining = None if self.queue_timeout is None else max(0.0, self.queue_timeout - (time.monotonic() - started))
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), remaining)
+            except asyncio.TimeoutError:
+                raise RateLimited(1.0)
+        except RateLimited:
+            self.rejected += 1
+            raise
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return self
+
+    async def __aexit__(self, *exc):
+        self.in_flight -= 1
+        self._semaphore.release()
@@ -0,0 +1,83 @@
+import pygame
+from collections import OrderedDict
+
+class LayeredRenderer:
+    """Static-background compositing with per-region dirty rects.
+
+    Each screen has a static layer (background, character art, translucent
+    panels) built once into a display-format surface. Dynamic parts are drawn
+    as named regions with a signature; a region is only restored from the
+    static layer and redrawn when its signature changes, and only those rects
+    are pushed to the display. Layers and other `cached` surfaces are kept
+    in an LRU bounded by `max_cache_bytes`.
+    """
+
+    def __init__(self, screen, max_cache_bytes=32 * 1024 * 1024):
+        self.screen = screen
+        self.max_cache_bytes = max_cache_bytes
+        self._cache = OrderedDict()
+        self._cache_bytes = 0
+        self._layer = None
+        self._layer_key = None
+        self._regions = {}  # name -> (signature, rect)
+        self._dirty = []
+        self._full = True
+
+    def set_screen(self, screen):
+        """Call after the display surface changes (e.g. on resize); drops all cached layers."""
+        self.screen = screen
+        self._cache.clear()
+        self._cache_bytes = 0
+        self.invalidate()
+
+    def invalidate(self):
+        self._layer_key = None
+        self._full = True
+
+    def cached(self, key, build):
+        """Build a surface once and reuse it for later frames (until it ages out of the LRU)."""
+        surface = self._cache.get(key)
+        if surface is not None:
+            self._cache.move_to_end(key)
+            return surface
+        surface = self._cache[key] = build()
+        self._cache_bytes += surface.get_width() * surface.get_height() * 4
+        while self._cache_bytes > self.max_cache_bytes and len(self._cache) > 1:
+            _, old = self._cache.popitem(last=False)
+            self._cache_bytes -= old.get_width() * old.get_height() * 4
+        return surface
+
+    def new_layer(self):
+        """An opaque, display-format surface the size of the screen."""
+        return pygame.Surface(self.screen.get_size()).convert()
+
+    def begin(self, key, build):
+        """Start a frame on the static layer `key`; switching layers redraws everything."""
+        if key != self._layer_key:
+            self._layer = self.cached(("layer", key), build)
+            self._layer_key = key
+            self._regions.clear()
+            self._full = True
+            self.screen.blit(self._layer, (0, 0))
+
+    def region(self, name, rect, signature, draw):
+        """Redraw `rect` with `draw()` if `signature` changed since the last frame."""
+        rect = pygame.Rect(rect).clip(self.screen.get_rect())
+        previous = self._regions.get(name)
+        if previous is not None and previous[0] == signature and previous[1] == rect:
+            return
+        area = rect if previous is None else rect.union(previous[1])
+        self.screen.blit(self._layer, area, area)
+        self.screen.set_clip(rect)
+        draw()
+        self.screen.set_clip(None)
+        self._regions[name] = (signature, rect)
+        self._dirty.append(area)
+
+    def present(self):
+        if self._full:
+            pygame.display.flip()
+        elif self._dirty:
+            pygame.display.update(self._dirty)
+        self._full = False
+        self._dirty = []
@@ -0,0 +1,214 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+LLM_TIMEOUT_S = float(os.getenv("LLM_Timeout_S", "15"))  # per attempt, until the first token
+LLM_STALL_TIMEOUT_S = float(os.getenv("LLM_Stall_Timeout_S", "20"))  # between chunks once streaming
+LLM_COMPLETE_TIMEOUT_S = float(os.getenv("LLM_Complete_Timeout_S", "60"))  # per attempt, for a whole non-streamed reply
+LLM_RETRIES = int(os.getenv("LLM_Retries", "2"))
+LLM_HEDGE = os.getenv("LLM_Hedge", "0") == "1"
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+class RequestTimeout(Exception):
+    """An attempt produced nothing before its deadline, or a stream stalled."""
+
+def status_code(error):
+    code = getattr(error, "status_code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code
+
+def is_retryable(error):
+    """Timeouts, dropped connections, 429 and 5xx are worth another try; 4xx are not."""
+    if isinstance(error, (RequestTimeout, asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    # httpx transport errors (connect/read failures) without importing httpx here
+    return type(error).__module__.startswith(("httpx", "httpcore"))
+
+def retry_after(error):
+    """Seconds from a Retry-After header on the error's HTTP response, if any."""
+    response = getattr(error, "raw_response", None) or getattr(error, "response", None)
+    value = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class _Attempt:
+    """One backend call pumping its chunks into a queue, so several can be raced."""
+
+    def __init__(self, factory):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._pump(factory))
+
+    async def _pump(self, factory):
+        try:
+            async for chunk in factory():
+                self.queue.put_nowait(("chunk", chunk))
+            self.queue.put_nowait(("end", None))
+        except Exception as e:
+            self.queue.put_nowait(("error", e))
+
+    def cancel(self):
+        self.task.cancel()
+
+class RequestManager:
+    """Deadlines, retries and optional hedging around one LLM call.
+
+    Each attempt has `timeout` seconds to produce its first chunk. Failed or
+    timed-out attempts are retried (up to `retries` more times) after an
+    exponential backoff with full jitter, or after the server's Retry-After if
+    that is longer. Once text has been shown a stream is never retried; a
+    stall longer than `stall_timeout` ends it with RequestTimeout instead.
+    A non-streamed `complete()` has `complete_timeout` per attempt for the
+    whole reply instead, since its first chunk is the entire generation.
+
+    With `hedge`, a second attempt is started when the first has not answered
+    within the p95 of recent first-chunk latencies; whichever answers first
+    wins and the other is cancelled. Cancelling the caller's task cancels all
+    attempts.
+    """
+
+    def __init__(self, timeout=LLM_TIMEOUT_S, stall_timeout=LLM_STALL_TIMEOUT_S, retries=LLM_RETRIES,
+                 hedge=LLM_HEDGE, complete_timeout=LLM_COMPLETE_TIMEOUT_S, backoff_base=0.5, backoff_max=8.0, hedge_min_samples=20, hedge_min_delay=0.5):
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self.complete_timeout = complete_timeout
+        self.retries = retries
+        self.hedge = hedge
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.latencies = deque(maxlen=200)  # seconds to first chunk of winning attempts
+        self.attempts = 0
+        self.retried = 0
+        self.hedged = 0
+
+    def hedge_delay(self):
+        """p95 first-chunk latency, or None until there are enough samples."""
+        if not self.hedge or len(self.latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return max(self.hedge_min_delay, ordered[int(0.95 * (len(ordered) - 1))])
+
+    def backoff(self, attempt, error):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        server_delay = retry_after(error)
+        return max(delay, server_delay) if server_delay is not None else delay
+
+    async def complete(self, call):
+        """Await `call()` (a coroutine factory) with `complete_timeout` per attempt and the same retries as `stream`."""
+        async def as_stream():
+            yield await call()
+        replies = self.stream(as_stream, self.complete_timeout)
+        try:
+            async for reply in replies:
+                return reply
+        finally:
+            await replies.aclose()
+
+    async def stream(self, call, whole_reply_timeout=None):
+        """Yield chunks from `call()` (an async generator factory) with retries before the first chunk.
+
+        With `whole_reply_timeout` the call yields its reply in one piece: that
+        deadline replaces `timeout`, and the attempt is neither hedged nor
+        counted in the first-chunk latencies.
+        """
+        for attempt in range(self.retries + 1):
+            try:
+                winner, first = await self._first_chunk(call, whole_reply_timeout)
+                break
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                self.retried += 1
+                await asyncio.sleep(self.backoff(attempt, e))
+
+        try:
+            if first is None:
+                return
+            yield first
+            while True:
+                try:
+                    kind, value = await asyncio.wait_for(winner.queue.get(), self.stall_timeout)
+                except asyncio.TimeoutError:
+                    raise RequestTimeout(f"no data for {self.stall_timeout:g}s")
+                if kind == "error":
+                    raise value
+                if kind == "end":
+                    return
+                yield value
+        finally:
+            winner.cancel()
+
+    async def _first_chunk(self, call, whole_reply_timeout=None):
+        """Race attempts (one, plus a hedge if enabled) to the first chunk; returns (attempt, chunk)."""
+        started = time.perf_counter()
+        running = [_Attempt(call)]
+        self.attempts += 1
+        timeout = whole_reply_timeout or self.timeout
+        hedge_at = self.hedge_delay() if whole_reply_timeout is None else None
+        if hedge_at is not None and hedge_at >= timeout:
+            hedge_at = None
+        error = None
+        getters = {}
+        try:
+            while running:
+                for attempt in running:
+                    if attempt not in getters:
+                        getters[attempt] = asyncio.ensure_future(attempt.queue.get())
+                elapsed = time.perf_counter() - started
+                if elapsed >= timeout:
+                    raise RequestTimeout(f"no reply within {timeout:g}s")
+                wait = timeout - elapsed
+                if hedge_at is not None and len(running) == 1:
+                    wait = min(wait, hedge_at - elapsed)
+
+                done, _ = await asyncio.wait(list(getters.values()), timeout=max(0.0, wait),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if hedge_at is not None and len(running) == 1:
+                        running.append(_Attempt(call))
+                        self.attempts += 1
+                        self.hedged += 1
+                        hedge_at = None
+                    continue
+
+                for attempt in list(running):
+                    getter = getters.get(attempt)
+                    if getter not in done:
+                        continue
+                    del getters[attempt]
+                    kind, value = getter.result()
+                    if kind == "error":
+                        running.remove(attempt)
+                        error = value
+                        continue
+                    if whole_reply_timeout is None:
+                        self.latencies.append(time.perf_counter() - started)
+                    for other in running:
+                        if other is not attempt:
+                            other.cancel()
+                    return attempt, (value if kind == "chunk" else None)
+            raise error
+        except BaseException:
+            for attempt in running:
+                attempt.cancel()
+            raise
+        finally:
+            for getter in getters.values():
+                getter.cancel()
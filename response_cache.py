@@ -0,0 +1,164 @@
+import os
+import json
+import asyncio
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# "deterministic" = only serve hits when Temperature is 0, "always", or "off"
+RESPONSE_CACHE_MODE = os.getenv("Response_Cache", "deterministic").lower()
+RESPONSE_CACHE_DIR = os.getenv("Response_Cache_Dir", os.path.join(".cache", "responses"))
+RESPONSE_CACHE_MAX_MB = float(os.getenv("Response_Cache_Max_MB", "50"))
+RESPONSE_CACHE_TTL_HOURS = float(os.getenv("Response_Cache_TTL_Hours", "168"))
+
+def _normalize(message):
+    text = " ".join(str(message["content"]).split())
+    if message["role"] == "user":
+        # "Black coffee" and "black  coffee " are the same order
+        text = text.casefold()
+    return [message["role"], text]
+
+def cache_key(model, params, messages):
+    """Stable hash of model, sampling params and the normalized message history."""
+    payload = json.dumps(
+        {"model": model, "params": params, "messages": [_normalize(m) for m in messages]},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """Two-tier reply cache: an in-memory LRU in front of a size-capped, TTL'd directory.
+
+    `get` and `put` are coroutines so file reads, writes and eviction never
+    run on the event loop.
+    """
+
+    def __init__(self, directory=RESPONSE_CACHE_DIR, mode=RESPONSE_CACHE_MODE, memory_entries=256,
+                 max_bytes=int(RESPONSE_CACHE_MAX_MB * 1024 * 1024), ttl=RESPONSE_CACHE_TTL_HOURS * 3600):
+        self.directory = directory
+        self.mode = mode
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()  # key -> (created, text)
+        self._disk = None  # key -> (last_used, size), loaded on first use
+        self._disk_bytes = 0
+        self._lock = threading.Lock()  # memory tier; never held during file I/O
+        self._disk_lock = threading.Lock()
+
+    def enabled_for(self, temperature):
+        if self.mode == "always":
+            return True
+        if self.mode == "deterministic":
+            return temperature == 0
+        return False
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".json")
+
+    def _load_index(self):
+        self._disk, self._disk_bytes = {}, 0
+        if not os.path.isdir(self.directory):
+            return
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                stat = os.stat(os.path.join(root, name))
+                self._disk[name[:-5]] = (stat.st_mtime, stat.st_size)
+                self._disk_bytes += stat.st_size
+
+    def _remove(self, key):
+        _, size = self._disk.pop(key, (0, 0))
+        self._disk_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    async def get(self, key):
+        """The cached reply or None; memory hits return at once, the disk tier is read on a thread."""
+        now = time.time()
+        text = self._from_memory(key, now)
+        return text if text is not None else await asyncio.to_thread(self._from_disk, key, now)
+
+    def _from_memory(self, key, now):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._memory.pop(key, None)
+            return None
+
+    def _from_disk(self, key, now):
+        with self._disk_lock:
+            if self._disk is None:
+                self._load_index()
+            if key in self._disk:
+                try:
+                    with open(self._path(key), encoding="utf-8") as f:
+                        created, text = json.load(f)
+                except (OSError, ValueError):
+                    created, text = 0, None
+                if text is not None and now - created <= self.ttl:
+                    os.utime(self._path(key))
+                    self._disk[key] = (now, self._disk[key][1])
+                    with self._lock:
+                        self._remember(key, created, text)
+                        self.hits += 1
+                    return text
+                self._remove(key)
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _remember(self, key, created, text):
+        self._memory[key] = (created, text)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    async def put(self, key, text):
+        """The reply is in memory at once; the file write and eviction run on a thread."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, text)
+        await asyncio.to_thread(self._write, key, now, text)
+
+    def _write(self, key, now, text):
+        data = json.dumps([now, text], ensure_ascii=False).encode("utf-8")
+        with self._disk_lock:
+            if self._disk is None:
+                self._load_index()
+            path = self._path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"Response cache write failed: {e}")
+                return
+            self._remove_from_index(key)
+            self._disk[key] = (now, len(data))
+            self._disk_bytes += len(data)
+            self._evict()
+
+    def _remove_from_index(self, key):
+        _, size = self._disk.pop(key, (0, 0))
+        self._disk_bytes -= size
+
+    def _evict(self):
+        if self._disk_bytes <= self.max_bytes:
+            return
+        # Drop least recently used files until we are back under the cap
+        for key, _ in sorted(self._disk.items(), key=lambda item: item[1][0]):
+            if self._disk_bytes <= self.max_bytes:
+                break
+            self._remove(key)
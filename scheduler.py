@@ -0,0 +1,99 @@
+import itertools
+import threading
+from collections import deque
+from queue import Empty, PriorityQueue
+from concurrent.futures import Future
+
+# Lower runs first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+DEFAULT_POOLS = {"network": 3, "stt": 1, "io": 2}
+
+class _Pool:
+    """A fixed number of worker threads serving one priority queue."""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.queue = PriorityQueue()
+        self.threads = [threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            _, _, job = self.queue.get()
+            if job is None:
+                return
+            future, fn, args, kwargs = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+class TaskScheduler:
+    """Bounded worker pools per resource class plus one completion channel.
+
+    `submit(pool, fn, ...)` queues a call on that pool's fixed set of threads
+    (so bursts of input queue up instead of spawning threads) and returns a
+    concurrent Future; queued tasks run by priority, then in submission order,
+    and `cancel()` on a task that has not started removes it. Running tasks
+    are never interrupted.
+
+    Results meant for the main loop go through `post(kind, item)`; `on_ready`
+    is called so an idle loop wakes up, and `drain()` hands over everything
+    that has arrived since the last frame at once.
+    """
+
+    def __init__(self, pools=None, on_ready=None):
+        self.on_ready = on_ready
+        self._pools = {name: _Pool(name, workers) for name, workers in (pools or DEFAULT_POOLS).items()}
+        self._sequence = itertools.count()
+        self._ready = deque()
+        self._closed = False
+
+    def submit(self, pool, fn, *args, priority=PRIORITY_NORMAL, **kwargs):
+        future = Future()
+        if self._closed:
+            future.cancel()
+            return future
+        self._pools[pool].queue.put((priority, next(self._sequence), (future, fn, args, kwargs)))
+        return future
+
+    def pending(self):
+        """Tasks waiting for a worker, per pool (shown in the F3 overlay)."""
+        return {name: pool.queue.qsize() for name, pool in self._pools.items()}
+
+    def post(self, kind, item):
+        """Hand a result to the main loop (thread-safe) and wake it."""
+        self._ready.append((kind, item))
+        if self.on_ready:
+            self.on_ready()
+
+    def drain(self):
+        """Every (kind, item) posted since the last call, oldest first."""
+        ready = []
+        while self._ready:
+            ready.append(self._ready.popleft())
+        return ready
+
+    def shutdown(self, wait=False, timeout=1.0):
+        """Cancel queued tasks and stop the workers once their current task ends."""
+        self._closed = True
+        for pool in self._pools.values():
+            while True:
+                try:
+                    _, _, job = pool.queue.get_nowait()
+                except Empty:
+                    break
+                if job is not None:
+                    job[0].cancel()
+            for _ in pool.threads:
+                pool.queue.put((float("inf"), next(self._sequence), None))
+        if wait:
+            for pool in self._pools.values():
+                for thread in pool.threads:
+                    thread.join(timeout)
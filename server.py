@@ -0,0 +1,180 @@
+"""Headless multi-session server: many players talk to Rita over HTTP or WebSocket from one process.
+
+    python server.py --port 8080
+
+HTTP:
+    POST   /sessions                    [{"player_id": "..."}] -> {"session_id", "greeting"}; a known
+                                        player's earlier conversations are recalled
+    POST   /sessions/{id}/messages      {"message": "..."} -> NDJSON stream of {"chunk"} lines,
+                                        then {"done": true, "reply", "trust"}
+    GET    /sessions/{id}               -> history and trust
+    DELETE /sessions/{id}
+    GET    /health                      -> sessions, in-flight and queued upstream calls
+WebSocket:
+    GET    /ws[?session_id=...]         send {"message": "..."}, receive {"type": "chunk"|"done"|"error", ...}
+"""
+import os
+import json
+import asyncio
+import argparse
+from aiohttp import web, WSMsgType
+from llm import close_client
+from prompt import GREETING
+from ratelimit import UpstreamLimiter, RateLimited
+from session import SessionStore
+
+SERVER_MAX_CONCURRENCY = int(os.getenv("Server_Max_Concurrency", "16"))  # upstream calls in flight
+SERVER_RATE_PER_SEC = float(os.getenv("Server_Rate_Per_Sec", "5"))  # upstream calls started per second
+SERVER_BURST = float(os.getenv("Server_Burst", "10"))
+SERVER_QUEUE_TIMEOUT_S = float(os.getenv("Server_Queue_Timeout_S", "10"))  # then 503 + Retry-After
+SERVER_SESSION_IDLE_S = float(os.getenv("Server_Session_Idle_S", "900"))
+SERVER_MAX_SESSIONS = int(os.getenv("Server_Max_Sessions", "1000"))
+MAX_MESSAGE_CHARS = 1000
+
+store_key = web.AppKey("store", SessionStore)
+limiter_key = web.AppKey("limiter", UpstreamLimiter)
+
+def _session_or_404(request):
+    session = request.app[store_key].get(request.match_info["session_id"])
+    if session is None:
+        raise web.HTTPNotFound(text="unknown session")
+    return session
+
+async def _read_message(request):
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text="expected a JSON body")
+    message = body.get("message", "") if isinstance(body, dict) else ""
+    if not isinstance(message, str) or not message.strip() or len(message) > MAX_MESSAGE_CHARS:
+        raise web.HTTPBadRequest(text=f"message must be 1-{MAX_MESSAGE_CHARS} characters")
+    return message.strip()
+
+async def create_session(request):
+    player_id = None
+    if request.can_read_body:
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise web.HTTPBadRequest(text="expected a JSON body")
+        player_id = body.get("player_id") if isinstance(body, dict) else None
+        if player_id is not None and (not isinstance(player_id, str) or not 0 < len(player_id) <= 64):
+            raise web.HTTPBadRequest(text="player_id must be 1-64 characters")
+    session = request.app[store_key].create(player_id)
+    return web.json_response({"session_id": session.id, "greeting": GREETING}, status=201)
+
+async def get_session(request):
+    return web.json_response(_session_or_404(request).snapshot())
+
+async def delete_session(request):
+    if request.app[store_key].remove(request.match_info["session_id"]) is None:
+        raise web.HTTPNotFound(text="unknown session")
+    return web.Response(status=204)
+
+async def post_message(request):
+    session = _session_or_404(request)
+    message = await _read_message(request)
+    limiter = request.app[limiter_key]
+
+    response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+    turn = session.turn(message, limiter)
+    try:
+        # Wait for the first chunk before committing to a 200, so rate limiting can still answer 503
+        try:
+            first = await turn.__anext__()
+        except RateLimited as e:
+            raise web.HTTPServiceUnavailable(text=str(e), headers={"Retry-After": str(max(1, round(e.retry_after)))})
+        except StopAsyncIteration:
+            first = None
+        await response.prepare(request)
+        try:
+            if first is not None:
+                await response.write(json.dumps({"chunk": first}).encode() + b"\n")
+            async for chunk in turn:
+                await response.write(json.dumps({"chunk": chunk}).encode() + b"\n")
+            final = {"done": True, "reply": session.history[-1]["content"], "trust": session.trust}
+        except Exception as e:
+            final = {"done": True, "error": f"Error getting response: {e}"}
+        await response.write(json.dumps(final).encode() + b"\n")
+        await response.write_eof()
+        return response
+    finally:
+        await turn.aclose()
+
+async def websocket(request):
+    store = request.app[store_key]
+    ws = web.WebSocketResponse(heartbeat=30)
+    await ws.prepare(request)
+
+    session = store.get(request.query.get("session_id", "")) or store.create()
+    await ws.send_json({"type": "session", "session_id": session.id, "greeting": GREETING})
+    async for msg in ws:
+        if msg.type != WSMsgType.TEXT:
+            continue
+        try:
+            message = json.loads(msg.data).get("message", "").strip()
+        except (json.JSONDecodeError, AttributeError):
+            message = ""
+        if not message or len(message) > MAX_MESSAGE_CHARS:
+            await ws.send_json({"type": "error", "error": f"message must be 1-{MAX_MESSAGE_CHARS} characters"})
+            continue
+        if store.get(session.id) is None:
+            session = store.create()  # evicted while the socket sat idle
+        try:
+            async for chunk in session.turn(message, request.app[limiter_key]):
+                await ws.send_json({"type": "chunk", "chunk": chunk})
+            await ws.send_json({"type": "done", "reply": session.history[-1]["content"], "trust": session.trust})
+        except RateLimited as e:
+            await ws.send_json({"type": "error", "error": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            await ws.send_json({"type": "error", "error": f"Error getting response: {e}"})
+    return ws
+
+async def health(request):
+    store, limiter = request.app[store_key], request.app[limiter_key]
+    return web.json_response({
+        "sessions": len(store.sessions),
+        "evicted": store.evicted,
+        "upstream_in_flight": limiter.in_flight,
+        "upstream_waiting": limiter.waiting,
+        "upstream_rejected": limiter.rejected,
+    })
+
+async def _evict_idle_sessions(app):
+    store = app[store_key]
+    while True:
+        await asyncio.sleep(max(1.0, min(60.0, store.idle_timeout / 4)))
+        store.evict_idle()
+
+async def _background(app):
+    task = asyncio.create_task(_evict_idle_sessions(app))
+    yield
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await close_client()
+
+def create_app(max_concurrency=SERVER_MAX_CONCURRENCY, rate=SERVER_RATE_PER_SEC, burst=SERVER_BURST,
+               queue_timeout=SERVER_QUEUE_TIMEOUT_S, idle_timeout=SERVER_SESSION_IDLE_S, max_sessions=SERVER_MAX_SESSIONS):
+    app = web.Application()
+    app[store_key] = SessionStore(idle_timeout, max_sessions)
+    app[limiter_key] = UpstreamLimiter(max_concurrency, rate, burst, queue_timeout)
+    app.cleanup_ctx.append(_background)
+    app.add_routes([
+        web.post("/sessions", create_session),
+        web.get("/sessions/{session_id}", get_session),
+        web.delete("/sessions/{session_id}", delete_session),
+        web.post("/sessions/{session_id}/messages", post_message),
+        web.get("/ws", websocket),
+        web.get("/health", health),
+    ])
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve Rita to many players over HTTP/WebSocket.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import time
+import uuid
+import asyncio
+import contextlib
+from llm import stream_model, TrustTagFilter
+from prompt import GREETING, PERSONA_PROMPT
+from prompt_builder import PromptBuilder
+from intents import IntentMatcher, LOCAL_INTENTS
+from memory import MemoryIndex, MEMORY
+
+class Session:
+    """One player's conversation with Rita (or another NPC): history, trust and prompt state, isolated from other players."""
+
+    def __init__(self, session_id=None, memory=None, persona=None, persona_prompt=None):
+        self.id = session_id or uuid.uuid4().hex
+        self.persona = persona  # an npc.Persona; None is Rita
+        greeting = persona.greeting if persona else GREETING
+        self.history = [{"role": "assistant", "content": greeting}] if greeting else []
+        self.trust = None  # set from the NPC's first [TRUST: X%] tag
+        # memory: the player's MemoryIndex, if they are known
+        self.builder = PromptBuilder(memory=memory, persona=persona_prompt or (persona.prompt if persona else PERSONA_PROMPT))
+        self.intents = IntentMatcher() if LOCAL_INTENTS and (persona is None or persona.intents) else None
+        self.created = self.last_active = time.monotonic()
+        self.turns = 0
+        self.last_intent = None  # name of the scripted intent that answered the last turn, if any
+        self.lock = asyncio.Lock()  # one turn at a time per player
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    async def turn(self, message, limiter=None):
+        """Answer one player message, yielding visible text as it streams; history and trust are updated at the end.
+
+        `limiter` (an async context manager) guards the upstream call only,
+        so scripted intents are never rate limited.
+        """
+        async with self.lock:
+            self.touch()
+            self.turns += 1
+            history = list(self.history)
+            self.history.append({"role": "user", "content": message})
+
+            scripted = self.intents.match(message) if self.intents else None
+            self.last_intent = scripted[0] if scripted else None
+            if scripted:
+                self.history.append({"role": "assistant", "content": scripted[1]})
+                self.builder.remember(self.history)
+                await self.builder.save_memory()
+                yield scripted[1]
+                return
+
+            trust_filter = TrustTagFilter()
+            try:
+                async with limiter or contextlib.nullcontext():
+                    async for chunk in stream_model(message, history, self.builder):
+                        visible = trust_filter.feed(chunk)
+                        if visible:
+                            yield visible
+            except BaseException:
+                # Keep the history consistent: drop the unanswered message
+                self.history.pop()
+                raise
+            reply, trust = trust_filter.finish()
+            if trust is not None:
+                self.trust = trust
+            self.history.append({"role": "assistant", "content": reply})
+            self.builder.remember(self.history)
+            await self.builder.save_memory()
+            self.touch()
+
+    def snapshot(self):
+        return {"session_id": self.id, "trust": self.trust, "turns": self.turns, "history": self.history}
+
+class SessionStore:
+    """Live sessions by id, with eviction of sessions idle longer than `idle_timeout` seconds."""
+
+    def __init__(self, idle_timeout=900, max_sessions=1000):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.evicted = 0
+        self.memories = {}  # player id -> MemoryIndex, shared by that player's sessions
+
+    def create(self, player_id=None):
+        """New session; with a `player_id` it recalls (and adds to) that player's earlier conversations."""
+        if len(self.sessions) >= self.max_sessions:
+            self.evict_idle()
+        if len(self.sessions) >= self.max_sessions:
+            # Still full: drop the least recently active one
+            oldest = min(self.sessions.values(), key=lambda s: s.last_active)
+            self.remove(oldest.id)
+            self.evicted += 1
+        memory = None
+        if player_id and MEMORY:
+            memory = self.memories.get(player_id)
+            if memory is None:
+                memory = self.memories[player_id] = MemoryIndex.for_player(player_id)
+        session = Session(memory=memory)
+        self.sessions[session.id] = session
+        return session
+
+    def get(self, session_id):
+        return self.sessions.get(session_id)
+
+    def remove(self, session_id):
+        return self.sessions.pop(session_id, None)
+
+    def evict_idle(self):
+        now = time.monotonic()
+        idle = [s.id for s in self.sessions.values() if now - s.last_active > self.idle_timeout and not s.lock.locked()]
+        for session_id in idle:
+            self.remove(session_id)
+        self.evicted += len(idle)
+        return len(idle)
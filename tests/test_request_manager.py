@@ -0,0 +1,111 @@
+import time
+import asyncio
+import pytest
+from request_manager import RequestManager, RequestTimeout
+
+class HTTPError(Exception):
+    """Stands in for an SDK error: a status code and the response headers."""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": headers or {}})()
+
+class FlakyBackend:
+    """In-process streaming backend: each call fails, stalls or streams as scripted."""
+
+    def __init__(self, *script):
+        self.script = list(script)  # per call: an exception, a delay in seconds, or None to stream at once
+        self.calls = 0
+        self.closed = 0  # streams whose generator was closed or cancelled before the end
+
+    async def stream(self, chunks=("Hello", " there")):
+        step = self.script[self.calls] if self.calls < len(self.script) else None
+        self.calls += 1
+        finished = False
+        try:
+            if isinstance(step, Exception):
+                raise step
+            if step:
+                await asyncio.sleep(step)
+            for chunk in chunks:
+                yield chunk
+                await asyncio.sleep(0)
+            finished = True
+        finally:
+            if not finished:
+                self.closed += 1
+
+def manager(**kwargs):
+    return RequestManager(**{"timeout": 1.0, "stall_timeout": 1.0, "retries": 2, "hedge": False,
+                             "backoff_base": 0.0, **kwargs})
+
+async def collect(manager, backend):
+    return [chunk async for chunk in manager.stream(backend.stream)]
+
+def test_retries_a_503():
+    backend = FlakyBackend(HTTPError(503))
+    requests = manager()
+    assert asyncio.run(collect(requests, backend)) == ["Hello", " there"]
+    assert backend.calls == 2
+    assert requests.retried == 1
+
+def test_waits_for_retry_after():
+    backend = FlakyBackend(HTTPError(429, {"retry-after": "0.2"}))
+    requests = manager()
+    started = time.perf_counter()
+    assert asyncio.run(collect(requests, backend)) == ["Hello", " there"]
+    assert time.perf_counter() - started >= 0.2
+    assert backend.calls == 2
+
+def test_does_not_retry_a_400():
+    backend = FlakyBackend(HTTPError(400))
+    requests = manager()
+    with pytest.raises(HTTPError):
+        asyncio.run(collect(requests, backend))
+    assert backend.calls == 1
+    assert requests.retried == 0
+
+def test_hedge_wins_over_a_slow_attempt():
+    backend = FlakyBackend(5.0)  # the first attempt hangs, the hedge answers at once
+    requests = manager(hedge=True, hedge_min_samples=1, hedge_min_delay=0.05)
+    requests.latencies.append(0.05)
+    started = time.perf_counter()
+    assert asyncio.run(collect(requests, backend)) == ["Hello", " there"]
+    assert time.perf_counter() - started < 1.0
+    assert requests.hedged == 1
+    assert backend.closed == 1  # the losing attempt was cancelled
+
+def test_cancelling_the_consumer_closes_the_stream():
+    backend = FlakyBackend()
+
+    async def main():
+        requests = manager()
+        seen = []
+
+        async def slow_stream():
+            async for chunk in backend.stream(["a"] * 100):
+                yield chunk
+                await asyncio.sleep(0.01)
+
+        async def consume():
+            async for chunk in requests.stream(slow_stream):
+                seen.append(chunk)
+        task = asyncio.create_task(consume())
+        while not seen:
+            await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.05)  # the abandoned generator is closed, which cancels the attempt
+        assert backend.closed == 1  # checked before asyncio.run cancels whatever is left
+        return seen
+
+    assert 0 < len(asyncio.run(main())) < 100
+
+def test_sub_second_timeout_message():
+    backend = FlakyBackend(1.0, 1.0)
+    requests = manager(timeout=0.05, retries=1)
+    with pytest.raises(RequestTimeout, match=r"no reply within 0\.05s"):
+        asyncio.run(collect(requests, backend))
+    assert backend.calls == 2
@@ -0,0 +1,162 @@
+from collections import OrderedDict
+import pygame
+
+PIXEL_FONT_PATH = "assets/PixelifySans-Regular.ttf"
+
+# Rasterized up front; anything else is added to the atlas on first use
+ATLAS_CHARSET = "".join(chr(c) for c in range(32, 127)) + "…‘’“”–—é°"
+MAX_KERNING_PAIRS = 20000
+KERNING_REPEATS = 16  # a pair is measured repeated this often, so fractional kerning survives pixel rounding
+
+class GlyphAtlas:
+    """Every glyph of one font in one color, rasterized once into a single surface."""
+
+    def __init__(self, font, color, antialias=True, charset=ATLAS_CHARSET):
+        self.font = font
+        self.color = color
+        self.antialias = antialias
+        self.height = font.get_height()
+        self.glyphs = {}  # char -> (area in surface, advance)
+        self.extra = {}   # chars outside the charset: char -> (own surface, advance)
+        glyphs = [(ch, font.render(ch, antialias, color)) for ch in dict.fromkeys(charset)]
+        width = sum(surface.get_width() for _, surface in glyphs)
+        self.surface = _alpha_surface((max(1, width), self.height))
+        x = 0
+        for ch, surface in glyphs:
+            self.surface.blit(surface, (x, 0))
+            self.glyphs[ch] = (pygame.Rect(x, 0, surface.get_width(), self.height), self._advance(ch, surface))
+            x += surface.get_width()
+
+    def _advance(self, ch, surface):
+        metrics = self.font.metrics(ch)
+        return metrics[0][4] if metrics and metrics[0] else surface.get_width()
+
+    def glyph(self, ch):
+        """(source surface, area or None, advance) for one character."""
+        entry = self.glyphs.get(ch)
+        if entry is not None:
+            return self.surface, entry[0], entry[1]
+        entry = self.extra.get(ch)
+        if entry is None:
+            surface = self.font.render(ch, self.antialias, self.color)
+            entry = self.extra[ch] = (surface, self._advance(ch, surface))
+        return entry[0], None, entry[1]
+
+def _alpha_surface(size):
+    surface = pygame.Surface(size, pygame.SRCALPHA)
+    return surface.convert_alpha() if pygame.display.get_surface() else surface
+
+class TextRenderer:
+    """Drop-in for pygame.font.Font that composes strings from cached glyphs.
+
+    `render` and `size` have the Font signatures, so layout code and ChatView
+    can use it unchanged. Glyphs come from one GlyphAtlas per color; composed
+    strings are kept in an LRU bounded by `max_cache_bytes`, so labels, hints
+    and status lines are rasterized once. Returned surfaces are shared and
+    must not be modified.
+    """
+
+    def __init__(self, font, max_cache_bytes=8 * 1024 * 1024):
+        self.font = font
+        self.max_cache_bytes = max_cache_bytes
+        self._atlases = {}
+        self._advances = {}
+        self._kerning = {}  # "ab" -> pen adjustment between a and b
+        self._strings = OrderedDict()
+        self._cache_bytes = 0
+
+    @classmethod
+    def load(cls, size, path=PIXEL_FONT_PATH, fallback="Arial"):
+        try:
+            return cls(pygame.font.Font(path, size))
+        except (OSError, FileNotFoundError):
+            return cls(pygame.font.SysFont(fallback, size))
+
+    def atlas(self, color, antialias=True):
+        key = (tuple(color), antialias)
+        atlas = self._atlases.get(key)
+        if atlas is None:
+            atlas = self._atlases[key] = GlyphAtlas(self.font, color, antialias)
+        return atlas
+
+    def get_height(self):
+        return self.font.get_height()
+
+    def get_linesize(self):
+        return self.font.get_linesize()
+
+    def advance(self, ch):
+        width = self._advances.get(ch)
+        if width is None:
+            metrics = self.font.metrics(ch)
+            width = self._advances[ch] = metrics[0][4] if metrics and metrics[0] else self.font.size(ch)[0]
+        return width
+
+    def kerning(self, a, b):
+        """Fractional pen adjustment between two characters, measured once from the font's own layout."""
+        pair = a + b
+        offset = self._kerning.get(pair)
+        if offset is None:
+            if len(self._kerning) >= MAX_KERNING_PAIRS:
+                self._kerning.clear()
+            # "abab..." holds n ab-gaps and n-1 ba-gaps, "baba..." the reverse; solve for the ab-gap
+            n = KERNING_REPEATS
+            base = n * (self.advance(a) + self.advance(b))
+            ab = self.font.size(pair * n)[0] - base
+            ba = self.font.size((b + a) * n)[0] - base
+            offset = self._kerning[pair] = (n * ab - (n - 1) * ba) / (2 * n - 1)
+        return offset
+
+    def _pen(self, text):
+        """x of every character as `render` places it (advances plus kerning), and the pen after the last."""
+        positions, x, previous = [], 0.0, None
+        for ch in text:
+            if previous is not None:
+                x += self.kerning(previous, ch)
+            positions.append(round(x))
+            x += self.advance(ch)
+            previous = ch
+        return positions, round(x)
+
+    def size(self, text):
+        width = sum(map(self.advance, text))
+        if len(text) > 1:
+            width += sum(map(self.kerning, text, text[1:]))
+        return round(width), self.font.get_height()
+
+    def prefix_width(self, text, count):
+        """Width of the first `count` characters, as laid out by `render`."""
+        positions, end = self._pen(text)
+        return positions[count] if count < len(positions) else end
+
+    def render(self, text, antialias, color, background=None):
+        if background is not None:
+            return self.font.render(text, antialias, color, background)
+        key = (text, tuple(color), antialias)
+        surface = self._strings.get(key)
+        if surface is not None:
+            self._strings.move_to_end(key)
+            return surface
+
+        atlas = self.atlas(color, antialias)
+        blits, x, width, previous = [], 0.0, 0, None
+        for ch in text:
+            if previous is not None:
+                x += self.kerning(previous, ch)
+            source, area, advance = atlas.glyph(ch)
+            left = round(x)
+            # MAX keeps each glyph's own color and alpha on the transparent surface
+            blits.append((source, (left, 0), area, pygame.BLEND_RGBA_MAX))
+            # Wide enough for glyphs that overhang their advance, not just the sum of advances
+            width = max(width, left + (area.width if area else source.get_width()))
+            x += advance
+            previous = ch
+        surface = _alpha_surface((max(width, round(x)), atlas.height))
+        surface.blits(blits, doreturn=False)
+
+        self._strings[key] = surface
+        self._cache_bytes += surface.get_width() * surface.get_height() * 4
+        while self._cache_bytes > self.max_cache_bytes and len(self._strings) > 1:
+            _, old = self._strings.popitem(last=False)
+            self._cache_bytes -= old.get_width() * old.get_height() * 4
+        return surface
@@ -0,0 +1,263 @@
+import os
+import io
+import re
+import math
+import time
+import wave
+import struct
+import hashlib
+import threading
+from scheduler import TaskScheduler, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from metrics import metrics
+
+TTS_ENGINE = os.getenv("TTS_Engine", "gtts").lower()
+TTS_CACHE_DIR = os.getenv("TTS_Cache_Dir", os.path.join(".cache", "tts"))
+TTS_WORKERS = int(os.getenv("TTS_Workers", "3"))
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_Cache_Max_MB", "100"))
+TTS_CACHE_TTL_HOURS = float(os.getenv("TTS_Cache_TTL_Hours", "720"))
+
+# Sentence end followed by what looks like a new sentence ("drink... while" stays together)
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?…])[\"')\]]*\s+(?=[A-Z0-9\"'*(\[])")
+
+def split_sentences(text):
+    """Split a reply into sentences; very short fragments are merged into the previous one."""
+    sentences = []
+    for part in SENTENCE_PATTERN.split(text.strip()):
+        part = part.strip()
+        if not part:
+            continue
+        if sentences and len(part) < 12:
+            sentences[-1] += " " + part
+        else:
+            sentences.append(part)
+    return sentences
+
+class GTTSEngine:
+    """Google Translate TTS over the network; returns MP3 bytes."""
+
+    name = "gtts"
+    format = "mp3"
+
+    def __init__(self, lang="en"):
+        self.lang = lang
+
+    def synthesize(self, text):
+        from gtts import gTTS
+        buffer = io.BytesIO()
+        gTTS(text=text, lang=self.lang).write_to_fp(buffer)
+        return buffer.getvalue()
+
+class OfflineEngine:
+    """Stand-in for tests and offline runs: a quiet tone as long as the text would take to say.
+
+    `latency_ms` simulates synthesis time so the pipeline can be measured
+    without network access.
+    """
+
+    name = "offline"
+    format = "wav"
+
+    def __init__(self, latency_ms=0, chars_per_second=15, sample_rate=16000):
+        self.latency_ms = latency_ms
+        self.chars_per_second = chars_per_second
+        self.sample_rate = sample_rate
+
+    def synthesize(self, text):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        frames = int(self.sample_rate * max(0.2, len(text) / self.chars_per_second))
+        samples = (int(800 * math.sin(2 * math.pi * 220 * i / self.sample_rate)) for i in range(frames))
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as out:
+            out.setnchannels(1)
+            out.setsampwidth(2)
+            out.setframerate(self.sample_rate)
+            out.writeframes(struct.pack(f"<{frames}h", *samples))
+        return buffer.getvalue()
+
+def create_engine(name=TTS_ENGINE):
+    if name == "offline":
+        return OfflineEngine()
+    return GTTSEngine()
+
+class PhraseCache:
+    """Content-addressed audio files: the same engine + text is only ever synthesized once.
+
+    Like the response cache, the directory is capped at `max_bytes` (least
+    recently played files go first) and files older than `ttl` seconds are
+    synthesized again, so one-off reply sentences cannot fill the disk.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=int(TTS_CACHE_MAX_MB * 1024 * 1024),
+                 ttl=TTS_CACHE_TTL_HOURS * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._files = None  # path -> (last_used, size), loaded on first use
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def path(self, engine, text):
+        digest = hashlib.sha256(f"{engine.name}:{getattr(engine, 'lang', '')}:{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.{engine.format}")
+
+    def _load_index(self):
+        self._files, self._bytes = {}, 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            self._files[path] = (stat.st_mtime, stat.st_size)
+            self._bytes += stat.st_size
+
+    def _remove(self, path):
+        _, size = self._files.pop(path, (0, 0))
+        self._bytes -= size
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get(self, engine, text):
+        path = self.path(engine, text)
+        now = time.time()
+        with self._lock:
+            if self._files is None:
+                self._load_index()
+            entry = self._files.get(path)
+            if entry is None:
+                return None
+            try:
+                if now - os.path.getmtime(path) > self.ttl:
+                    self._remove(path)
+                    return None
+                with open(path, "rb") as f:
+                    data = f.read()
+                os.utime(path)  # mtime is the last time it was played
+            except OSError:
+                self._remove(path)
+                return None
+            self._files[path] = (now, entry[1])
+            return data
+
+    def put(self, engine, text, data):
+        path = self.path(engine, text)
+        with self._lock:
+            if self._files is None:
+                self._load_index()
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"TTS cache write failed: {e}")
+                return
+            _, size = self._files.pop(path, (0, 0))
+            self._bytes += len(data) - size
+            self._files[path] = (time.time(), len(data))
+            self._evict()
+
+    def _evict(self):
+        if self._bytes <= self.max_bytes:
+            return
+        # Drop least recently played files until we are back under the cap
+        for path, _ in sorted(self._files.items(), key=lambda item: item[1][0]):
+            if self._bytes <= self.max_bytes:
+                break
+            self._remove(path)
+
+class Utterance:
+    """Handle for one spoken reply; `wait()` blocks until it has played (or was cancelled)."""
+
+    def __init__(self, text):
+        self.text = text
+        self.clips = []  # one per sentence, queued on the AudioEngine
+        self.cancelled = False
+        self.created = time.perf_counter()
+
+    def done(self):
+        return all(clip.done.is_set() for clip in self.clips)
+
+    def cancel(self):
+        self.cancelled = True
+        for clip in self.clips:
+            clip.cancel()
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for clip in self.clips:
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            if not clip.done.wait(remaining):
+                return False
+        return True
+
+    def _started(self, clip):
+        # Time from speak() until Rita is audible
+        metrics.observe("tts.playback_start_ms", (clip.started - self.created) * 1000)
+
+class TTSPipeline:
+    """Sentence-level TTS: synthesize sentences concurrently, play them in order.
+
+    Playback of sentence 1 starts as soon as it is ready while later sentences
+    are still being synthesized on the scheduler's "network" pool; the first
+    sentence of a reply jumps ahead of queued work. The pending sentences are
+    queued on the AudioEngine, whose driver thread waits for each in turn, so
+    no pool worker is held during playback. Every synthesized sentence goes
+    through the PhraseCache.
+    """
+
+    def __init__(self, engine=None, cache=None, audio=None, max_workers=TTS_WORKERS, scheduler=None):
+        from audio import AudioEngine
+        self.engine = engine or create_engine()
+        self.cache = cache or PhraseCache()
+        self.audio = audio or AudioEngine()
+        self._owns_scheduler = scheduler is None
+        self.scheduler = scheduler or TaskScheduler({"network": max_workers})
+        self._utterances = []
+
+    def synthesize(self, text):
+        """Audio bytes for one sentence, from the cache when possible."""
+        data = self.cache.get(self.engine, text)
+        if data is None:
+            with metrics.timer("tts.synthesis_ms"):
+                data = self.engine.synthesize(text)
+            self.cache.put(self.engine, text, data)
+        return data
+
+    def prefetch(self, text, priority=PRIORITY_LOW):
+        """Synthesize into the cache without playing (e.g. fixed greetings)."""
+        return [self.scheduler.submit("network", self.synthesize, sentence, priority=priority)
+                for sentence in split_sentences(text)]
+
+    def speak(self, text):
+        sentences = split_sentences(text)
+        futures = [self.scheduler.submit("network", self.synthesize, sentence,
+                                         priority=PRIORITY_HIGH if i == 0 else PRIORITY_NORMAL)
+                   for i, sentence in enumerate(sentences)]
+        utterance = Utterance(text)
+        utterance.clips = [self.audio.enqueue(future, on_start=utterance._started if i == 0 else None)
+                           for i, future in enumerate(futures)]
+        self._utterances = [u for u in self._utterances if not u.done()] + [utterance]
+        return utterance
+
+    def cancel_all(self):
+        """Stop talking: cancel queued and in-progress utterances (e.g. when the player barges in)."""
+        for utterance in self._utterances:
+            utterance.cancel()
+        self._utterances = []
+        self.audio.cancel_all()
+
+    def shutdown(self):
+        self.cancel_all()
+        if self._owns_scheduler:
+            self.scheduler.shutdown()
@@ -0,0 +1,281 @@
+import os
+import math
+import time
+import wave
+import threading
+from array import array
+from collections import deque
+from scheduler import TaskScheduler
+from metrics import metrics
+
+STT_BACKEND = os.getenv("STT_Backend", "google").lower()
+STT_WAV_FILE = os.getenv("STT_Wav_File")  # feed a WAV file instead of the microphone
+STT_FIXED_TEXT = os.getenv("STT_Fixed_Text", "black coffee")  # what the fixed backend "hears"
+VOICE_HANDS_FREE = os.getenv("Voice_Hands_Free", "0") == "1"
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30
+
+class UnknownSpeech(Exception):
+    """The recognizer heard something but could not make out any words."""
+
+class RecognitionFailed(Exception):
+    """The recognizer backend itself failed (network, missing model, ...)."""
+
+# Audio sources: 16-bit mono PCM at SAMPLE_RATE
+
+class MicrophoneSource:
+    """The default microphone, opened once and kept open."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        import speech_recognition as sr
+        self.sample_rate = sample_rate
+        self._mic = sr.Microphone(sample_rate=sample_rate)
+        self._mic.__enter__()
+
+    def read(self, frames):
+        return self._mic.stream.read(frames)
+
+    def close(self):
+        self._mic.__exit__(None, None, None)
+
+class WavFileSource:
+    """Stand-in for tests: plays a WAV file (16-bit mono) into the capture loop, then silence.
+
+    With `realtime` the reads are paced like a real microphone.
+    """
+
+    def __init__(self, path, realtime=True):
+        with wave.open(path, "rb") as f:
+            if f.getsampwidth() != 2 or f.getnchannels() != 1:
+                raise ValueError("WavFileSource needs 16-bit mono audio")
+            self.sample_rate = f.getframerate()
+            self._data = f.readframes(f.getnframes())
+        self.realtime = realtime
+        self._pos = 0
+
+    def read(self, frames):
+        if self.realtime:
+            time.sleep(frames / self.sample_rate)
+        chunk = self._data[self._pos:self._pos + frames * 2]
+        self._pos += len(chunk)
+        return chunk + b"\0" * (frames * 2 - len(chunk))
+
+    def close(self):
+        pass
+
+# Recognizer backends: recognize(pcm_bytes, sample_rate) -> text
+
+class SpeechRecognitionBackend:
+    """Any speech_recognition recognizer method, e.g. google (online), sphinx or whisper (local)."""
+
+    def __init__(self, method="google", **options):
+        import speech_recognition as sr
+        self._sr = sr
+        self._recognizer = sr.Recognizer()
+        self.method = method
+        self.options = options
+
+    def recognize(self, pcm, sample_rate):
+        sr = self._sr
+        audio = sr.AudioData(pcm, sample_rate, 2)
+        try:
+            return getattr(self._recognizer, f"recognize_{self.method}")(audio, **self.options).strip()
+        except sr.UnknownValueError:
+            raise UnknownSpeech()
+        except sr.RequestError as e:
+            raise RecognitionFailed(str(e))
+
+class FixedTextBackend:
+    """Stand-in for tests: every utterance is recognized as the same text."""
+
+    def __init__(self, text):
+        self.text = text
+
+    def recognize(self, pcm, sample_rate):
+        return self.text
+
+def create_recognizer(name=STT_BACKEND):
+    """google (online), sphinx (offline, pocketsphinx), whisper (local model) or fixed (STT_Fixed_Text)."""
+    if name == "fixed":
+        return FixedTextBackend(STT_FIXED_TEXT)
+    if name == "whisper":
+        return SpeechRecognitionBackend("whisper", model="base.en")
+    return SpeechRecognitionBackend(name)
+
+def create_source():
+    return WavFileSource(STT_WAV_FILE) if STT_WAV_FILE else MicrophoneSource()
+
+def frame_energy(pcm):
+    samples = array("h", pcm)
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(v * v for v in samples) / len(samples))
+
+class VoiceCaptureService:
+    """Keeps the microphone open and turns its stream into recognized utterances.
+
+    Calibration runs once at start (`calibration_seconds`); afterwards the noise
+    floor keeps adapting from frames that are not speech. Utterances are
+    segmented with an energy VAD: speech starts after `start_frames` loud
+    frames (with `preroll_ms` of audio kept from before), and ends after
+    `end_silence_ms` of quiet, which is much shorter than waiting for a fixed
+    phrase timeout.
+
+    Push-to-talk: call `arm()` and the next utterance is recognized. Hands-free:
+    every utterance is recognized. Recognition runs on the scheduler's "stt"
+    pool, so the capture loop never waits for it. Results go to `on_result(status, text)` with
+    status "success" or "error"; `on_state()` is called when `listening` flips.
+    """
+
+    def __init__(self, on_result, on_state=None, source_factory=create_source, recognizer=None,
+                 hands_free=VOICE_HANDS_FREE, calibration_seconds=1.0, threshold_ratio=2.5, min_threshold=300,
+                 start_frames=3, end_silence_ms=450, preroll_ms=300, max_utterance_s=10, listen_timeout_s=5,
+                 scheduler=None):
+        self.on_result = on_result
+        self.on_state = on_state
+        self.source_factory = source_factory
+        self.recognizer = recognizer or create_recognizer()
+        self.hands_free = hands_free
+        self.calibration_seconds = calibration_seconds
+        self.threshold_ratio = threshold_ratio
+        self.min_threshold = min_threshold
+        self.start_frames = start_frames
+        self.end_silence_frames = max(1, end_silence_ms // FRAME_MS)
+        self.preroll_frames = max(1, preroll_ms // FRAME_MS)
+        self.max_utterance_frames = int(max_utterance_s * 1000 // FRAME_MS)
+        self.listen_timeout_s = listen_timeout_s
+
+        self.noise_floor = None
+        self.calibration_time = None
+        self.ready = threading.Event()  # calibrated, or `error` is set
+        self.error = None
+        self.listening = False
+        self._armed_at = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._owns_scheduler = scheduler is None
+        self.scheduler = scheduler or TaskScheduler({"stt": 1})
+
+    @property
+    def threshold(self):
+        return max(self.min_threshold, (self.noise_floor or 0) * self.threshold_ratio)
+
+    def start(self):
+        with self._lock:
+            self._start()
+
+    def _start(self):
+        # Also restarts a capture thread that gave up (no microphone, device busy, ...)
+        if self._thread is None or not self._thread.is_alive():
+            self.ready.clear()
+            self.error = None
+            self._thread = threading.Thread(target=self._run, name="voice-capture", daemon=True)
+            self._thread.start()
+
+    def arm(self):
+        """Push-to-talk: recognize the next utterance (retrying the microphone if it failed before)."""
+        with self._lock:
+            self._start()
+            self._armed_at = time.perf_counter()
+            self._set_listening(True)
+
+    def disarm(self):
+        with self._lock:
+            self._armed_at = None
+            self._set_listening(False)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+            self._thread = None
+        if self._owns_scheduler:
+            self.scheduler.shutdown()
+
+    def _set_listening(self, value):
+        if self.listening != value:
+            self.listening = value
+            if self.on_state:
+                self.on_state()
+
+    def _armed(self):
+        return self.hands_free or self._armed_at is not None
+
+    def _run(self):
+        try:
+            source = self.source_factory()
+            frame_samples = source.sample_rate * FRAME_MS // 1000
+            try:
+                self._calibrate(source, frame_samples)
+                self._capture_loop(source, frame_samples)
+            finally:
+                source.close()
+        except Exception as e:
+            self.error = e
+            self.on_result("error", f"[Microphone error: {e}]")
+        finally:
+            # Nothing is listening any more: drop the push-to-talk state so the next arm() starts over
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+                self._armed_at = None
+                self._set_listening(False)
+            self.ready.set()
+
+    def _calibrate(self, source, frame_samples):
+        started = time.perf_counter()
+        frames = max(1, int(self.calibration_seconds * 1000 // FRAME_MS))
+        energies = sorted(frame_energy(source.read(frame_samples)) for _ in range(frames))
+        # Median ignores a cough or door slam during calibration
+        self.noise_floor = energies[len(energies) // 2]
+        self.calibration_time = time.perf_counter() - started
+        metrics.observe("stt.calibration_ms", self.calibration_time * 1000)
+        self.ready.set()
+
+    def _capture_loop(self, source, frame_samples):
+        preroll = deque(maxlen=self.preroll_frames)
+        speech, loud_run, quiet_run = None, 0, 0
+
+        while not self._stop.is_set():
+            frame = source.read(frame_samples)
+            energy = frame_energy(frame)
+            loud = energy > self.threshold
+
+            if speech is None:
+                preroll.append(frame)
+                loud_run = loud_run + 1 if loud else 0
+                if not loud:
+                    # Background recalibration from non-speech frames
+                    self.noise_floor = 0.95 * self.noise_floor + 0.05 * energy
+                if loud_run >= self.start_frames and self._armed():
+                    speech, quiet_run = list(preroll), 0
+                    preroll.clear()
+                elif self._armed_at is not None and time.perf_counter() - self._armed_at > self.listen_timeout_s:
+                    self.disarm()
+                    self.on_result("error", "[No speech detected]")
+                continue
+
+            speech.append(frame)
+            quiet_run = 0 if loud else quiet_run + 1
+            if quiet_run >= self.end_silence_frames or len(speech) >= self.max_utterance_frames:
+                pcm = b"".join(speech[:len(speech) - quiet_run + 1])
+                # Speech plus the trailing silence needed to decide it had ended
+                metrics.observe("stt.capture_ms", len(speech) * FRAME_MS)
+                speech, loud_run = None, 0
+                if not self.hands_free:
+                    self.disarm()
+                self.scheduler.submit("stt", self._recognize, pcm, source.sample_rate)
+
+    def _recognize(self, pcm, sample_rate):
+        try:
+            with metrics.timer("stt.recognition_ms"):
+                text = self.recognizer.recognize(pcm, sample_rate)
+            self.on_result("success", text)
+        except UnknownSpeech:
+            self.on_result("error", "[Could not understand audio]")
+        except RecognitionFailed as e:
+            self.on_result("error", f"[Speech service error: {e}]")
+        except Exception as e:
+            self.on_result("error", f"[Speech service error: {e}]")